@@ -31,6 +31,34 @@ IGNORE_STATES_WITHOUT_TRANSITIONS = [
     "retracted",
 ]
 
+# Transitions with guards depending on the single object and not only on the
+# signature (portal_type, review_state) of the object. These guards are
+# evaluated for each object, even if the transitions are grouped by signature.
+OBJECT_SPECIFIC_TRANSITIONS = [
+    "assign",
+    "cancel",
+    "create_partitions",
+    "detach",
+    "dispatch",
+    "invalidate",
+    "multi_results",
+    "multi_verify",
+    "prepublish",
+    "publish",
+    "receive",
+    "reinstate",
+    "reject",
+    "restore",
+    "retest",
+    "retract",
+    "rollback_to_receive",
+    "sample",
+    "submit",
+    "to_be_verified",
+    "unassign",
+    "verify",
+]
+
 
 @implementer(IListingTransitions)
 class ListingTransitions(object):
@@ -101,12 +129,52 @@ class ListingTransitions(object):
     def get_transitions(self, uids):
         """Returns a sorted list of possible transitions
         """
-        transitions = []
-        transitions_by_tid = {}
-
         custom_transitions = self.get_custom_transitions(uids)
         workflow_transitions = self.get_workflow_transitions(uids)
         all_transitions = custom_transitions + workflow_transitions
+        return self.sort_transitions(all_transitions, uids)
+
+    def get_transitions_by_uid(self, uids):
+        """Returns the workflow transition IDs of each object and all possible
+        transitions of the objects
+
+        N.B. Objects in a state without transitions, which are ignored when
+             the common transitions are calculated, have `None` as IDs
+
+        N.B. The listing app calculates the transitions of any selection from
+             these IDs, so the object specific transitions are always
+             evaluated for each object alone
+
+        :param uids: UIDs of the objects
+        :returns: Tuple of UID -> transition IDs mapping and the sorted list
+                  of all custom and workflow transitions
+        """
+        tids_by_uid = {}
+        transitions_by_tid = {}
+
+        for uid, transitions, review_state in self.iter_transitions(uids):
+            if not transitions:
+                if review_state in IGNORE_STATES_WITHOUT_TRANSITIONS:
+                    tids_by_uid[uid] = None
+                    continue
+            tids_by_uid[uid] = map(lambda t: t.get("id"), transitions)
+            for transition in transitions:
+                transitions_by_tid[transition.get("id")] = transition
+
+        custom_transitions = self.get_custom_transitions(uids)
+        all_transitions = custom_transitions + transitions_by_tid.values()
+        return tids_by_uid, self.sort_transitions(all_transitions, uids)
+
+    def sort_transitions(self, all_transitions, uids):
+        """Filter the allowed transitions and sort them by their weights
+
+        :param all_transitions: List of custom and workflow transitions
+        :param uids: UIDs of the selected items
+        :returns: Sorted list of unique transitions
+        """
+        transitions = []
+        transitions_by_tid = {}
+
         allowed_transition_ids = self.get_allowed_transition_ids(uids)
 
         # unify all allowed transitions by their ID
@@ -133,6 +201,143 @@ class ListingTransitions(object):
 
         return transitions
 
+    def get_object_specific_transition_ids(self):
+        """Returns the IDs of transitions with object specific guards
+
+        :returns: Set of transition IDs
+        """
+        return set(OBJECT_SPECIFIC_TRANSITIONS)
+
+    def get_signature_key(self, obj):
+        """Returns the signature of the object the transitions depend on
+
+        Objects with the same signature have the same transitions, except the
+        object specific ones. Override to add guard relevant attributes.
+
+        :param obj: The selected object
+        :returns: Hashable signature or None to evaluate the object alone
+        """
+        review_state = api.get_review_status(obj)
+        if not review_state:
+            return None
+        return (api.get_portal_type(obj), review_state)
+
+    def get_transitions_and_state(self, obj):
+        """Returns the transitions and the review state of the object
+
+        :param obj: The selected object
+        :returns: Tuple of transitions and review state
+        """
+        transitions = api.get_transitions_for(obj)
+        review_state = None
+        if not transitions:
+            review_state = api.get_review_status(obj)
+        return transitions, review_state
+
+    def get_object_specific_transitions(self, obj, transitions=None):
+        """Returns the object specific transitions the guards allow
+
+        :param obj: The selected object
+        :param transitions: Known transitions to reuse by ID
+        :returns: List of transitions
+        """
+        known = dict(map(lambda t: (t.get("id"), t), transitions or []))
+        object_specific = self.get_object_specific_transition_ids()
+        wf_tool = api.get_tool("portal_workflow")
+        allowed = []
+        allowed_tids = set()
+        for workflow in wf_tool.getWorkflowsFor(obj):
+            for tid in object_specific.difference(allowed_tids):
+                transition = workflow.transitions.get(tid)
+                # N.B. only user actions are listed as possible transitions
+                if transition is None or not transition.actbox_name:
+                    continue
+                if not workflow.isActionSupported(obj, tid):
+                    continue
+                info = known.get(tid)
+                if info is None:
+                    info = self.get_transition_info(obj, transition)
+                allowed.append(info)
+                allowed_tids.add(tid)
+        return allowed
+
+    def get_transition_info(self, obj, transition):
+        """Returns the transition info like `api.get_transitions_for`
+
+        :param obj: The object the transition is performed on
+        :param transition: DCWorkflow transition definition
+        :returns: Transition info dictionary
+        """
+        return {
+            "id": transition.getId(),
+            "title": transition.title,
+            "title_or_id": transition.title_or_id(),
+            "description": transition.description,
+            "name": transition.actbox_name or transition.title,
+            "url": transition.actbox_url % {
+                "content_url": api.get_url(obj),
+                "portal_url": api.get_url(api.get_portal()),
+                "folder_url": api.get_url(api.get_parent(obj)),
+            },
+        }
+
+    def get_member_transitions_and_state(self, obj, representative):
+        """Returns the transitions and the review state of an object with the
+        same signature as the representative
+
+        The transitions with object independent guards are taken from the
+        representative and only the object specific ones are evaluated.
+
+        :param obj: The selected object
+        :param representative: Transitions and review state of the
+                               representative object
+        :returns: Tuple of transitions and review state
+        """
+        object_specific = self.get_object_specific_transition_ids()
+        transitions = filter(lambda t: t.get("id") not in object_specific,
+                             representative[0])
+        transitions.extend(
+            self.get_object_specific_transitions(obj, representative[0]))
+        review_state = None
+        if not transitions:
+            review_state = api.get_review_status(obj)
+        return transitions, review_state
+
+    def iter_transitions(self, uids, group=None):
+        """Generates the transitions and review states of the selected objects
+
+        If grouping is enabled, all guards are evaluated for one
+        representative object per signature. For the other objects with the
+        same signature, only the object specific guards are evaluated.
+
+        :param uids: UIDs of the selected items
+        :param group: Group by signature, defaults to the view option
+                      `group_transitions_by_signature`
+        :returns: Generator of (uid, transitions, review_state) tuples
+        """
+        if group is None:
+            group = getattr(self.view, "group_transitions_by_signature", False)
+
+        # transitions and review state of the representatives by signature
+        representatives = {}
+
+        for uid in uids:
+            obj = self.get_object_by_uid(uid)
+            if obj is None:
+                continue
+
+            key = self.get_signature_key(obj) if group else None
+            representative = representatives.get(key) if key else None
+            if representative is None:
+                result = self.get_transitions_and_state(obj)
+                if key is not None:
+                    representatives[key] = result
+            else:
+                result = self.get_member_transitions_and_state(
+                    obj, representative)
+
+            yield (uid, ) + result
+
     def get_workflow_transitions(self, uids):
         """Get workflow transitions for the given UIDs
 
@@ -145,13 +350,8 @@ class ListingTransitions(object):
         # internal mapping of transition id -> transition
         transitions_by_tid = {}
 
-        for uid in uids:
-            obj = self.get_object_by_uid(uid)
-            if obj is None:
-                continue
-            transitions = api.get_transitions_for(obj)
+        for uid, transitions, review_state in self.iter_transitions(uids):
             if not transitions:
-                review_state = api.get_review_status(obj)
                 # Skip/ignore some workflow states without further transitions
                 # for usability purposes especially in Worksheets.
                 # => This allows a user to select all Analyses and still be
@@ -18,34 +18,52 @@
 # Copyright 2018-2024 by it's authors.
 # Some rights reserved, see README and LICENSE.
 
+import hashlib
 import inspect
 import json
 
 import six
+import transaction
 from bika.lims import api
+from bika.lims import logger
 from bika.lims.browser import BrowserView
 from plone.memoize import view
 from Products.Archetypes.event import ObjectEditedEvent
 from Products.Five.browser.pagetemplatefile import ViewPageTemplateFile
+from senaite.app.listing import senaiteMessageFactory as _
+from senaite.app.listing.cache import listing_config_cache
+from senaite.app.listing.cache import to_hashable
 from senaite.app.listing.decorators import inject_runtime
+from senaite.app.listing.decorators import returns_not_modified
 from senaite.app.listing.decorators import returns_safe_json
 from senaite.app.listing.decorators import set_application_json_header
 from senaite.app.listing.decorators import translate
+from senaite.app.listing.folderitem import FolderItem
+from senaite.app.listing.indexing import ReindexQueue
 from senaite.app.listing.interfaces import IAjaxListingView
 from senaite.app.listing.interfaces import IChildFolderItems
 from senaite.app.listing.interfaces import IListingTransitions
 from senaite.app.listing.interfaces import IListingWorkflowTransition
 from senaite.app.listing.interfaces import ITransposedListingView
+from senaite.app.listing.jobs import TransitionJob
+from senaite.app.listing.jobs import get_job
+from senaite.app.listing.jobs import get_job_progress
+from senaite.app.listing.jobs import is_job_done
+from senaite.app.listing.jobs import is_job_stale
+from senaite.app.listing.jobs import transition_jobs
+from senaite.app.listing.serializer import to_columnar
+from senaite.app.listing.serializer import to_relative_urls
+from senaite.app.listing.timing import Timings
 from senaite.core.decorators import readonly_transaction
 from senaite.core.interfaces import IDataManager
 from senaite.core.registry import get_registry_record
 from six.moves.urllib.parse import urlencode
+from ZODB.POSException import ConflictError
 from zope import event
 from zope.component import getMultiAdapter
 from zope.component import queryAdapter
 from zope.component import queryMultiAdapter
 from zope.interface import implementer
-from zope.lifecycleevent import modified
 from zope.publisher.interfaces import IPublishTraverse
 
 
@@ -64,6 +82,14 @@ class AjaxListingView(BrowserView):
     def __init__(self, context, request):
         super(AjaxListingView, self).__init__(context, request)
         self.traverse_subpath = []
+        # additional runtime information injected into the JSON responses
+        self.runtime_info = {}
+        # wall time of the phases injected into the JSON responses
+        self.timings = Timings()
+        # wall time per column, `folderitem` and subscriber adapter if enabled
+        self.profiler = None
+        # objects to reindex before the folderitems are rebuilt
+        self.reindex_queue = ReindexQueue()
 
     def ajax_contents_table(self, *args, **kwargs):
         """Render the ReactJS enabled contents table template
@@ -200,6 +226,33 @@ class AjaxListingView(BrowserView):
 
         return transitions_adapter.get_transitions(uids)
 
+    def set_transition_ids(self, folderitems):
+        """Set the allowed workflow transition IDs to the folderitems
+
+        :param folderitems: List of folderitems
+        :returns: Dictionary with all possible transitions of the folderitems
+                  and the IDs of the custom transitions
+        """
+        uids = filter(None, map(lambda item: item.get("uid"), folderitems))
+
+        # Get listing adapter to get possible transitions
+        transitions_adapter = getMultiAdapter(
+            (self, self.context, self.request), IListingTransitions)
+
+        tids_by_uid, transitions = transitions_adapter.get_transitions_by_uid(
+            uids)
+        for folderitem in folderitems:
+            uid = folderitem.get("uid")
+            if uid:
+                folderitem["transition_ids"] = tids_by_uid.get(uid)
+
+        custom_transitions = transitions_adapter.get_custom_transitions(uids)
+        return {
+            "transition_definitions": transitions,
+            "custom_transition_ids": map(
+                lambda t: t.get("id"), custom_transitions),
+        }
+
     def get_category_uid(self, brain_or_object, accessor="getCategoryUID"):
         """Get the category UID from the brain or object
 
@@ -247,6 +300,19 @@ class AjaxListingView(BrowserView):
     @translate
     def get_folderitems(self):
         """This method calls the folderitems method
+
+        N.B. The JSON endpoints use `generate_folderitems`, because their i18n
+             messages are translated when the response is serialized
+        """
+        return list(self.generate_folderitems())
+
+    def generate_folderitems(self):
+        """Generates the folderitems one by one
+
+        N.B. All folderitems are computed at once if the view overrides the
+        `folderitems` method
+
+        :returns: Generator of folderitems
         """
         # workaround for `pagesize` handling
         pagesize = self.get_pagesize()
@@ -256,7 +322,22 @@ class AjaxListingView(BrowserView):
         self.update()
         self.before_render()
 
-        return self.folderitems()
+        if self.is_overridden("folderitems"):
+            folderitems = self.folderitems()
+        else:
+            folderitems = self.iter_folderitems()
+
+        # omit the empty sub-mappings if the listing app adds them again
+        key = "{}_compact".format(self.get_form_id())
+        compact = self.request.form.get(key, False)
+
+        for folderitem in folderitems:
+            if isinstance(folderitem, FolderItem):
+                if compact:
+                    folderitem.compact()
+                else:
+                    folderitem.expand()
+            yield folderitem
 
     def get_selected_uids(self, folderitems, uids_to_keep=None):
         """Lookup selected UIDs from the folderitems
@@ -276,18 +357,15 @@ class AjaxListingView(BrowserView):
     def get_listing_config(self):
         """Get the configuration settings of the current listing view
         """
+        config_hash, static_config = self.get_static_listing_config()
 
         config = {
             "form_id": self.form_id,
             "form_name": self.get_form_name(),
-            "review_states": self.get_review_states(),
-            "columns": self.get_columns(),
             "content_filter": self.contentFilter,
             "allow_edit": self.allow_edit,
             "api_url": self.get_api_url(),
             "catalog": self.catalog,
-            "catalog_indexes": self.get_catalog_indexes(),
-            "catalog_columns": self.get_metadata_columns(),
             "categories": self.categories,
             "default_review_state": self.default_review_state,
             "expand_all_categories": self.expand_all_categories,
@@ -306,16 +384,78 @@ class AjaxListingView(BrowserView):
             "sort_on": self.get_sort_on(),
             "manual_sort_on": self.manual_sort_on,
             "sort_order": self.get_sort_order(),
-            "sortable_columns": self.get_sortable_columns(),
             "show_search": self.show_search,
             "fetch_transitions_on_select": self.fetch_transitions_on_select,
+            "transition_chunk_size": self.transition_chunk_size,
+            "background_transition_threshold":
+                self.background_transition_threshold,
             "view_context_state": api.get_workflow_status_of(self.context),
             "allow_row_reorder": self.allow_row_reorder,
             "transposed": ITransposedListingView.providedBy(self),
+            "config_hash": config_hash,
         }
 
+        # update the static config
+        config.update(static_config)
+
         return config
 
+    @view.memoize
+    def get_static_listing_config(self):
+        """Get the translated configuration settings which only change with
+        the definition of the view
+
+        The config is cached per view class, listing view adapters, review
+        state and language together with the definition of the columns and
+        review states.
+
+        :returns: Tuple of config hash and config
+        """
+        try:
+            key = self.get_static_listing_config_key()
+            cached = listing_config_cache.get(key)
+        except TypeError:
+            # unhashable values in the view definition
+            key = cached = None
+        if cached is not None:
+            return cached
+
+        with self.timings.span("config"):
+            config = {
+                "review_states": self.get_review_states(),
+                "columns": self.get_columns(),
+                "catalog_indexes": self.get_catalog_indexes(),
+                "catalog_columns": self.get_metadata_columns(),
+                "sortable_columns": self.get_sortable_columns(),
+            }
+            dump = json.dumps(config, sort_keys=True, default=repr)
+            config_hash = hashlib.md5(dump).hexdigest()
+
+        if key is not None:
+            listing_config_cache.set(key, (config_hash, config))
+        return config_hash, config
+
+    @view.memoize
+    def get_static_listing_config_key(self):
+        """Returns the cache key of the static listing config
+
+        N.B. The key is computed only once per view, because the conversion
+             of the column definitions is expensive
+        """
+        adapters = map(lambda adapter: "{}.{}".format(
+            adapter.__class__.__module__, adapter.__class__.__name__),
+            self.get_listing_view_adapters())
+        return (
+            self.__class__.__module__,
+            self.__class__.__name__,
+            tuple(adapters),
+            self.review_state.get("id", self.default_review_state),
+            self.get_language(),
+            self.catalog,
+            to_hashable(self.columns),
+            to_hashable(self.review_states),
+        )
+
     def get_sortable_columns(self):
         """Return sortable columns
 
@@ -331,6 +471,10 @@ class AjaxListingView(BrowserView):
     def set_field(self, obj, name, value):
         """Set the value
 
+        N.B. The updated objects are reindexed and notified as modified when
+             the reindex queue is flushed, at the latest before the
+             transaction commits
+
         :returns: List of updated/changed objects
         """
 
@@ -342,16 +486,16 @@ class AjaxListingView(BrowserView):
         # set the value with the datamanager
         updated_objects = datamanager.set(name, value)
 
-        # reindex the objects
-        map(lambda obj: obj.reindexObject(), updated_objects)
-
-        # notify that the objects were modified
-        map(modified, updated_objects)
+        # queue the objects for reindexing and their modified events
+        # N.B. the queue is flushed once before the folderitems are rebuilt
+        for updated_object in updated_objects:
+            self.reindex_queue.add(updated_object, notify_modified=True)
 
         return updated_objects
 
     @readonly_transaction
     @set_application_json_header
+    @returns_not_modified
     @returns_safe_json
     @inject_runtime
     def ajax_folderitems(self):
@@ -376,11 +520,38 @@ class AjaxListingView(BrowserView):
         # this serves `request.get` calls
         self.request.other.update(form_data)
 
-        # generate a query string from the form data
-        query_string = urlencode(form_data)
-
         # get the folder items
-        folderitems = self.get_folderitems()
+        folderitems = list(self.generate_folderitems())
+
+        # prepare the response object
+        data = self.get_folderitems_data(payload, folderitems)
+
+        # allowed transition IDs per folderitem
+        if self.include_transition_ids:
+            data.update(self.set_transition_ids(folderitems))
+
+        # send portal relative URLs if requested
+        if payload.get("relative_urls"):
+            folderitems = to_relative_urls(folderitems, data["base_url"])
+
+        # send the folderitems in the columnar format if requested
+        if payload.get("format") == "columnar":
+            data["folderitems"] = to_columnar(folderitems)
+            data["format"] = "columnar"
+        else:
+            data["folderitems"] = folderitems
+
+        return data
+
+    def get_folderitems_data(self, payload, folderitems):
+        """Prepare the data of a folderitems response for the listing app
+
+        :param payload: The HTTP POST JSON payload
+        :param folderitems: The folderitems of the response
+        :returns: Response data without the folderitems
+        """
+        # generate a query string from the form data
+        query_string = urlencode(self.to_form_data(payload))
 
         # Process selected UIDs and their allowed transitions
         uids_to_keep = payload.get("selected_uids")
@@ -390,21 +561,85 @@ class AjaxListingView(BrowserView):
         # get the view config
         config = self.get_listing_config()
 
-        # prepare the response object
+        # omit the static config if the client has it already
+        if payload.get("config_hash") == config["config_hash"]:
+            for key in self.get_static_listing_config()[1].keys():
+                config.pop(key, None)
+
         data = {
             "count": len(folderitems),
-            "folderitems": folderitems,
             "query_string": query_string,
             "selected_uids": selected_uids,
             "total": self.total,
+            "total_is_estimate": self.total_is_estimate,
             "transitions": transitions,
         }
 
+        # base URL to expand the relative URLs
+        if payload.get("relative_urls"):
+            data["base_url"] = self.get_portal_url()
+
         # update the config
         data.update(config)
 
         return data
 
+    @readonly_transaction
+    @set_application_json_header
+    @returns_safe_json
+    @inject_runtime
+    def ajax_deferred_columns(self):
+        """Computes the cells of the deferred columns for the given UIDs
+
+        Required POST JSON Payload:
+
+        :uids: UIDs of the folderitems to compute the cells for
+        :columns: Keys of the deferred columns to compute
+        """
+
+        # Get the HTTP POST JSON Payload
+        payload = self.get_json()
+
+        uids = payload.get("uids", [])
+        columns = payload.get("columns", [])
+
+        if not uids or not columns:
+            return {"folderitems": []}
+
+        # N.B. only the requested columns are resolved
+        payload.update({
+            "columns": columns,
+            "limit_from": 0,
+            "pagesize": len(uids),
+        })
+
+        # Fake a HTTP GET request with parameters, so that the `bika_listing`
+        # view handles them correctly.
+        form_data = self.to_form_data(payload)
+
+        # this serves `request.form.get` calls
+        self.request.form.update(form_data)
+
+        # this serves `request.get` calls
+        self.request.other.update(form_data)
+
+        # compute the deferred columns in this request
+        self.deferred_columns = columns
+
+        # restrict the results to the requested items
+        self.contentFilter["UID"] = uids
+
+        # get the folderitems
+        folderitems = list(self.generate_folderitems())
+
+        # prepare the response object
+        data = {
+            "columns": columns,
+            "folderitems": folderitems,
+        }
+
+        return data
+
     @readonly_transaction
     @set_application_json_header
     @returns_safe_json
@@ -471,6 +706,10 @@ class AjaxListingView(BrowserView):
         parent_uid = payload.get("parent_uid")
         child_uids = payload.get("child_uids", [])
 
+        # N.B. the cells of deferred columns are not loaded for child rows
+        #      in a second request, so they are computed right away
+        self.deferred_columns = []
+
         # get the child folderitems adapter
         adapter = getMultiAdapter(
             (self, self.context, self.request), IChildFolderItems)
@@ -516,7 +755,7 @@ class AjaxListingView(BrowserView):
         self.contentFilter = query
 
         # get the folderitems
-        folderitems = self.get_folderitems()
+        folderitems = list(self.generate_folderitems())
 
         # prepare the response object
         data = {
@@ -526,6 +765,115 @@ class AjaxListingView(BrowserView):
 
         return data
 
+    def flush_reindex_queue(self):
+        """Reindex the queued objects and process pending catalog operations
+        """
+        with self.timings.span("reindex"):
+            self.reindex_queue.flush()
+
+    def get_transition_chunks(self, uids):
+        """Split the UIDs into the chunks a background job commits one by one
+
+        :param uids: list of UIDs to transition
+        :returns: list of UID lists
+        """
+        size = max(api.to_int(self.background_transition_chunk_size, 1), 1)
+        return [uids[i:i + size] for i in range(0, len(uids), size)]
+
+    def do_transition_for(self, uid, transition):
+        """Execute the transition for the object with the given UID
+
+        :param uid: UID of the object to transition
+        :param transition: ID of the transition to perform
+        :returns: the IListingWorkflowTransition adapter used
+        """
+        obj = api.get_object_by_uid(uid)
+
+        # try named workflow transition adapter first
+        adapter = queryMultiAdapter(
+            (self, obj, self.request),
+            interface=IListingWorkflowTransition,
+            name=transition)
+        if adapter is None:
+            # get generic workflow transition adapter
+            adapter = getMultiAdapter(
+                (self, obj, self.request),
+                interface=IListingWorkflowTransition)
+
+        # execute the transition
+        adapter.do_transition(transition)
+
+        return adapter
+
+    def do_transitions_for(self, uids, transition):
+        """Execute the transition for the objects with the given UIDs
+
+        N.B. Each transition runs inside a savepoint, which allows to roll
+             back the changes of a single failed transition without affecting
+             the others. If a joined data manager does not support
+             savepoints, the changes of a failed transition are kept.
+
+        :param uids: UIDs of the objects to transition
+        :param transition: ID of the transition to perform
+        :returns: tuple of errors and redirects by UID and the affected UIDs
+        """
+        errors = {}
+        redirects = {}
+        affected_uids = set()
+
+        for uid in uids:
+            try:
+                savepoint = transaction.savepoint()
+            except TypeError:
+                # a joined data manager does not support savepoints
+                savepoint = None
+
+            try:
+                adapter = self.do_transition_for(uid, transition)
+                error = adapter.get_error() if adapter.failed else None
+            except ConflictError:
+                raise
+            except Exception as exc:
+                logger.exception("Failed to transition '{}' with '{}'"
+                                 .format(uid, transition))
+                error = _("An unknown error occurred during transition '{}' "
+                          "on '{}': {}".format(transition, uid, exc))
+
+            # collect errors
+            if error is not None:
+                if savepoint is not None:
+                    savepoint.rollback()
+                errors[uid] = error
+                continue
+
+            # collect redirects
+            redirect = adapter.get_redirect_url()
+            if redirect:
+                redirects[uid] = redirect
+
+            # update affected uids
+            affected_uids.update(adapter.get_uids())
+
+        return errors, redirects, affected_uids
+
+    def commit_transitions(self, uids, transition):
+        """Commit the transitions of the objects with the given UIDs
+
+        :param uids: UIDs of the transitioned objects
+        :param transition: ID of the performed transition
+        :returns: errors by UID if the commit failed
+        """
+        self.flush_reindex_queue()
+        try:
+            transaction.commit()
+        except ConflictError:
+            transaction.abort()
+            message = _("A database conflict error occurred during "
+                        "transition '{}'. Please try again."
+                        .format(transition))
+            return dict.fromkeys(uids, message)
+        return {}
+
     @set_application_json_header
     @returns_safe_json
     @inject_runtime
@@ -536,6 +884,12 @@ class AjaxListingView(BrowserView):
 
         :uids: A list of UIDs to transition
         :transition: The transition to perform
+
+        A failed transition is rolled back without affecting the other
+        objects of the request.
+
+        N.B. The listing app sends the selected UIDs in chunks of
+             `transition_chunk_size`, which are committed one by one
         """
 
         # Get the HTTP POST JSON Payload
@@ -549,43 +903,17 @@ class AjaxListingView(BrowserView):
         uids = payload.get("uids")
         transition = payload.get("transition")
 
-        errors = {}
-        redirects = {}
-        affected_uids = set(uids)
-
-        for uid in uids:
-            obj = api.get_object_by_uid(uid)
-
-            # try named workflow transition adapter first
-            adapter = queryMultiAdapter(
-                (self, obj, self.request),
-                interface=IListingWorkflowTransition,
-                name=transition)
-            if adapter is None:
-                # get generic workflow transition adapter
-                adapter = getMultiAdapter(
-                    (self, obj, self.request),
-                    interface=IListingWorkflowTransition)
+        errors, redirects, affected_uids = self.do_transitions_for(
+            uids, transition)
+        affected_uids.update(uids)
 
-            # execute the transition
-            adapter.do_transition(transition)
-
-            # collect errors
-            if adapter.failed:
-                errors[uid] = adapter.get_error()
-
-            # collect redirects
-            redirect = adapter.get_redirect_url()
-            if redirect:
-                redirects[uid] = redirect
-
-            # update affected uids
-            affected_uids.update(adapter.get_uids())
+        # process the pending catalog operations of the transitions
+        self.flush_reindex_queue()
 
         # fetch updated folderitems
         affected_uids = list(affected_uids)
         self.contentFilter["UID"] = affected_uids
-        folderitems = self.get_folderitems()
+        folderitems = list(self.generate_folderitems())
 
         # prepare the response object
         data = {
@@ -598,6 +926,75 @@ class AjaxListingView(BrowserView):
 
         return data
 
+    @set_application_json_header
+    @returns_safe_json
+    @inject_runtime
+    def ajax_enqueue_transition(self):
+        """Transition multiple objects in a background job
+
+        The POST Payload needs to provide the following data:
+
+        :uids: A list of UIDs to transition
+        :transition: The transition to perform
+
+        The progress of the job can be polled with `ajax_transition_job`.
+        """
+
+        # Get the HTTP POST JSON Payload
+        payload = self.get_json()
+
+        required = ["uids", "transition"]
+        if not all(map(lambda k: k in payload, required)):
+            return self.json_message("Payload needs to provide the keys {}"
+                                     .format(", ".join(required)), status=400)
+
+        uids = payload.get("uids")
+        transition = payload.get("transition")
+
+        job = TransitionJob(self, uids, transition)
+        record = transition_jobs.enqueue(job)
+
+        return get_job_progress(record)
+
+    @readonly_transaction
+    @set_application_json_header
+    @returns_safe_json
+    @inject_runtime
+    def ajax_transition_job(self):
+        """Returns the progress of a background transition job
+
+        The POST Payload needs to provide the following data:
+
+        :job_id: The ID of the job
+
+        The folderitems of all affected objects are included once the job is
+        done or considered lost.
+        """
+
+        # Get the HTTP POST JSON Payload
+        payload = self.get_json()
+
+        record = get_job(payload.get("job_id"))
+        user_id = api.get_current_user().getId()
+        if record is None or record["user_id"] != user_id:
+            return self.json_message("Job not found", status=404)
+
+        data = get_job_progress(record)
+        if not is_job_done(record) and not is_job_stale(record):
+            return data
+
+        # fetch updated folderitems
+        affected_uids = list(record["affected_uids"])
+        self.contentFilter["UID"] = affected_uids
+        folderitems = list(self.generate_folderitems())
+        data.update({
+            "count": len(folderitems),
+            "uids": affected_uids,
+            "folderitems": folderitems,
+        })
+
+        return data
+
     @set_application_json_header
     @returns_safe_json
     @inject_runtime
@@ -632,13 +1029,16 @@ class AjaxListingView(BrowserView):
             return self.json_message("Failed to set field of save queue '{}'"
                                      .format(save_queue), 500)
 
+        # reindex all updated objects once and notify that they were modified
+        self.flush_reindex_queue()
+
         # notify object edited
         map(self.notify_edited, updated_objects)
 
         # get the updated folderitems
         updated_uids = map(api.get_uid, updated_objects)
         self.contentFilter["UID"] = updated_uids
-        folderitems = self.get_folderitems()
+        folderitems = list(self.generate_folderitems())
 
         # prepare the response object
         data = {
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.APP.LISTING.
+#
+# SENAITE.APP.LISTING is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2024 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import collections
+import threading
+
+from zope.i18nmessageid import Message
+
+_marker = object()
+
+
+class LRUCache(object):
+    """Thread-safe cache that evicts the least recently used entries
+
+    The size of the cache is the number of entries, or the sum of the sizes
+    returned by the optional `getsize` function for each cached value.
+    """
+
+    def __init__(self, maxsize=1000, getsize=None):
+        self.maxsize = maxsize
+        self.getsize = getsize
+        self.currsize = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._data = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Returns the cached value and marks it as recently used
+
+        :param key: The cache key
+        :param default: Returned if the key is not cached
+        :returns: The cached value or default
+        """
+        with self._lock:
+            value = self._data.pop(key, _marker)
+            if value is _marker:
+                self.misses += 1
+                return default
+            # re-insert the value as the most recently used entry
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Cache the value and evict the least recently used entries
+
+        :param key: The cache key
+        :param value: The value to cache
+        """
+        size = self.get_size(value)
+        # do not cache values that exceed the whole cache
+        if size > self.maxsize:
+            return
+        with self._lock:
+            old = self._data.pop(key, _marker)
+            if old is not _marker:
+                self.currsize -= self.get_size(old)
+            self._data[key] = value
+            self.currsize += size
+            while self.currsize > self.maxsize:
+                old_key, old = self._data.popitem(last=False)
+                self.currsize -= self.get_size(old)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Remove the cached value of the key
+
+        :param key: The cache key
+        """
+        with self._lock:
+            old = self._data.pop(key, _marker)
+            if old is not _marker:
+                self.currsize -= self.get_size(old)
+
+    def get_size(self, value):
+        """Returns the size of the value in the cache
+        """
+        if self.getsize is None:
+            return 1
+        return self.getsize(value)
+
+    def clear(self):
+        """Remove all entries
+        """
+        with self._lock:
+            self._data.clear()
+            self.currsize = 0
+
+    def get_stats(self):
+        """Returns the size and the hit/miss counters of the cache
+        """
+        return {
+            "size": self.currsize,
+            "entries": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SortKeyIndex(object):
+    """Process-local index of precomputed sort keys
+
+    The sort keys are stored per catalog and sort criteria and are mapped by
+    the record ID (RID) of the catalog brain. The `modified` metadata of the
+    brain is stored along with the key to detect outdated sort keys.
+
+    N.B. The least recently used sort keys are evicted if more than `maxsize`
+         keys are indexed
+    """
+
+    def __init__(self, maxsize=500000):
+        self._lock = threading.Lock()
+        # mapping of catalog ID -> sort criteria with indexed keys
+        self._sort_ons = {}
+        # mapping of (catalog ID, sort criteria, RID) -> (modified, key)
+        self._keys = LRUCache(maxsize=maxsize)
+
+    def get_catalog_ids(self):
+        """Returns the IDs of all catalogs with indexed sort keys
+        """
+        return self._sort_ons.keys()
+
+    def get(self, catalog_id, sort_on, rid, modified=None, default=None):
+        """Returns the sort key for the given RID
+
+        :param catalog_id: ID of the catalog
+        :param sort_on: The sort criteria
+        :param rid: Record ID of the catalog brain
+        :param modified: The current modification date of the brain
+        :param default: Returned if no valid sort key is indexed
+        :returns: The indexed sort key or default
+        """
+        value = self._keys.get((catalog_id, sort_on, rid), _marker)
+        if value is _marker:
+            return default
+        # the object was modified after the key was indexed
+        if value[0] != modified:
+            return default
+        return value[1]
+
+    def set(self, catalog_id, sort_on, rid, key, modified=None):
+        """Index the sort key for the given RID
+
+        :param catalog_id: ID of the catalog
+        :param sort_on: The sort criteria
+        :param rid: Record ID of the catalog brain
+        :param key: The sort key
+        :param modified: The current modification date of the brain
+        """
+        with self._lock:
+            self._sort_ons.setdefault(catalog_id, set()).add(sort_on)
+        self._keys.set((catalog_id, sort_on, rid), (modified, key))
+
+    def invalidate(self, catalog_id, rid):
+        """Remove all sort keys of the given RID
+
+        :param catalog_id: ID of the catalog
+        :param rid: Record ID of the catalog brain
+        """
+        for sort_on in list(self._sort_ons.get(catalog_id, [])):
+            self._keys.delete((catalog_id, sort_on, rid))
+
+    def clear(self):
+        """Remove all sort keys
+        """
+        with self._lock:
+            self._sort_ons.clear()
+        self._keys.clear()
+
+
+# process-local sort key index
+sort_key_index = SortKeyIndex()
+
+# searchable text of catalog brains for the metadata search
+searchable_text_cache = LRUCache(maxsize=50000)
+
+# translated review state titles
+review_state_title_cache = LRUCache(maxsize=5000)
+
+# record IDs of catalog results, limited by the total number of cached RIDs
+search_results_cache = LRUCache(
+    maxsize=500000, getsize=lambda value: len(value[0]))
+
+# translated static listing configs with their hash
+listing_config_cache = LRUCache(maxsize=1000)
+
+
+def to_hashable(thing):
+    """Convert a catalog query to a hashable and order independent key
+
+    N.B. i18n messages are distinguished by their domain and mapping as well
+
+    :param thing: Catalog query or query value
+    :returns: Hashable representation
+    """
+    if isinstance(thing, Message):
+        return (thing, thing.domain, to_hashable(thing.mapping), thing.default)
+    if isinstance(thing, dict):
+        return tuple(sorted(
+            map(lambda item: (item[0], to_hashable(item[1])), thing.items())))
+    if isinstance(thing, (list, tuple, set)):
+        return tuple(map(to_hashable, thing))
+    return thing
@@ -35,6 +35,7 @@ class IListingRegistry(ISenaiteRegistry):
         fields=[
             "listing_enable_ajax_transitions",
             "listing_active_ajax_transitions",
+            "listing_enable_profiler",
         ],
     )
 
@@ -60,3 +61,14 @@ class IListingRegistry(ISenaiteRegistry):
         ],
         required=False,
     )
+
+    listing_enable_profiler = schema.Bool(
+        title=_("Enable Profiler"),
+        description=_(
+            "Measure the time spent per column, folderitem method and "
+            "listing view adapter. The ranking is logged and returned with "
+            "the listing data. Managers can profile single requests with the "
+            "'X-Listing-Profile' header."),
+        default=False,
+        required=False,
+    )
@@ -18,37 +18,32 @@
 # Copyright 2018-2024 by it's authors.
 # Some rights reserved, see README and LICENSE.
 
-import json
 import time
 from functools import wraps
 
 from bika.lims import api
 from bika.lims import logger
-from DateTime import DateTime
-from senaite.core.i18n import translate as t
+from senaite.app.listing.serializer import ListingSerializer
 from zope.i18nmessageid import Message
 
 
 def returns_safe_json(func):
     """Returns a safe JSON string
+
+    N.B. i18n messages are translated on serialization
     """
     @wraps(func)
     def wrapper(*args, **kw):
-        def default(obj):
-            """This function handles unhashable objects
-            """
-            # Convert `DateTime` objects to ISO8601 format
-            if isinstance(obj, DateTime):
-                obj = obj.ISO8601()
-            # Convert objects and brains to UIDs
-            if api.is_object(obj):
-                obj = api.get_uid(obj)
-            if isinstance(obj, basestring):
-                return obj
-            return str(obj)
-
         data = func(*args, **kw)
-        return json.dumps(data, default=default)
+        timings = getattr(args[0], "timings", None) if args else None
+        if timings is None:
+            return ListingSerializer().dumps(data)
+        with timings.span("serialize"):
+            body = ListingSerializer().dumps(data)
+        # emit the wall time of the phases
+        response = api.get_request().response
+        response.setHeader("Server-Timing", timings.to_header())
+        return body
     return wrapper
 
 
@@ -64,6 +59,26 @@ def set_application_json_header(func):
     return wrapper
 
 
+def returns_not_modified(func):
+    """Answer with "304 Not Modified" if the client has the current response
+
+    N.B. The ETag is computed by the `get_etag` method of the view
+    """
+    @wraps(func)
+    def wrapper(self, *args, **kw):
+        etag = self.get_etag()
+        if etag:
+            response = self.request.response
+            response.setHeader("ETag", etag)
+            response.setHeader("Cache-Control", "private, no-cache")
+            if_none_match = self.request.getHeader("If-None-Match") or ""
+            if etag in map(lambda tag: tag.strip(), if_none_match.split(",")):
+                response.setStatus(304)
+                return ""
+        return func(self, *args, **kw)
+    return wrapper
+
+
 def translate(func):
     """Translate i18n `Message` objects in data structures
 
@@ -73,6 +88,9 @@ def translate(func):
     """
     @wraps(func)
     def wrapper(*args, **kw):
+        # N.B. memoizes the translations of repeated messages
+        serializer = ListingSerializer()
+
         def translate_thing(thing):
             # Deconstruct lists
             if isinstance(thing, list):
@@ -83,7 +101,7 @@ def translate(func):
                     thing[key] = translate_thing(value)
             # Translate i18n Message strings
             if isinstance(thing, Message):
-                return t(thing)
+                return serializer.translate(thing)
             return thing
         data = func(*args, **kw)
         return translate_thing(data)
@@ -102,6 +120,20 @@ def inject_runtime(func):
         duration = end - start
         # inject the runtime into the returning dictionary
         result.update(dict(_runtime=duration))
+        # inject additional runtime information of the view
+        runtime_info = getattr(args[0], "runtime_info", None)
+        if runtime_info:
+            result.update(dict(_runtime_info=runtime_info))
+        # inject the wall time of the phases
+        timings = getattr(args[0], "timings", None)
+        if timings:
+            result.update(dict(_timings=timings.to_dict()))
+        # inject the ranking of the profiled functions
+        profiler = getattr(args[0], "profiler", None)
+        if profiler:
+            profiler.log(logger)
+            if args[0].is_profile_visible():
+                result.update(dict(_profile=profiler.get_ranking()))
         logger.info("Execution of '{}' took {:2f}s".format(
             func.__name__, duration))
         return result
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.APP.LISTING.
+#
+# SENAITE.APP.LISTING is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2024 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+
+class FolderItem(dict):
+    """Folderitem of a single listing row
+
+    Most of the column specific sub-mappings, e.g. `before`, `after` or
+    `replace`, stay empty for a row. Therefore they are created on first
+    access only. Before the folderitem is sent to the listing app, the
+    missing sub-mappings are either created by `expand` or the empty ones
+    are dropped by `compact`.
+    """
+    __slots__ = ()
+
+    # Factories for the lazily created sub-mappings
+    defaults = {
+        # a list of names of fields that may be edited on this item
+        "allow_edit": list,
+        # a list of column keys which are filled in by a second request
+        "deferred": list,
+        # a dict where the column name works as a key and the value is
+        # the name of the field related with the column. It is used
+        # when the name given to the column and the content field it
+        # represents diverges.
+        "field": dict,
+        "before": dict,
+        "after": dict,
+        "replace": dict,
+        "choices": dict,
+        "class": dict,
+        "tabindex": dict,
+        # allows to set a per column help text, e.g.
+        # item["help"]["result"] = _("Some help text for the result")
+        "help": dict,
+    }
+
+    def __missing__(self, key):
+        factory = self.defaults.get(key)
+        if factory is None:
+            raise KeyError(key)
+        value = self[key] = factory()
+        return value
+
+    def get(self, key, default=None):
+        if key in self or key in self.defaults:
+            return self[key]
+        return default
+
+    def expand(self):
+        """Create the missing sub-mappings
+
+        :returns: The folderitem itself
+        """
+        for key, factory in self.defaults.items():
+            if key not in self:
+                self[key] = factory()
+        return self
+
+    def compact(self):
+        """Remove the empty sub-mappings
+
+        N.B. Only for listing apps that add the missing sub-mappings again
+
+        :returns: The folderitem itself
+        """
+        for key in self.defaults:
+            if key in self and not self[key]:
+                del self[key]
+        return self
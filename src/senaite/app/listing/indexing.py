@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.APP.LISTING.
+#
+# SENAITE.APP.LISTING is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2024 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import collections
+
+import transaction
+from bika.lims import api
+from Products.CMFCore.indexing import processQueue
+from zope.lifecycleevent import modified
+
+
+class ReindexQueue(object):
+    """Request-scoped queue that reindexes each object only once
+
+    Objects that are added multiple times are reindexed once with the merged
+    index names. An empty list of index names reindexes all indexes.
+    Modified events of queued objects are notified after the reindexing.
+
+    N.B. The queue is flushed at the latest before the transaction commits,
+         in case no explicit flush happened.
+
+    N.B. Workflow transitions are not queued, because the objects and their
+         dependents are reindexed by the event handlers of `doActionFor`.
+         Flushing the queue only processes their pending catalog operations.
+    """
+
+    def __init__(self):
+        # mapping of object path -> (object, index names)
+        self._objects = collections.OrderedDict()
+        # mapping of object path -> object to notify as modified
+        self._modified = collections.OrderedDict()
+        # transaction with the registered before commit hook
+        self._transaction = None
+
+    def __len__(self):
+        return len(self._objects)
+
+    def add(self, obj, idxs=None, notify_modified=False):
+        """Queue the object for reindexing
+
+        :param obj: The object to reindex
+        :param idxs: Names of the indexes to update or None for all indexes
+        :param notify_modified: Notify a modified event after the reindexing
+        """
+        self.register_hook()
+        key = api.get_path(obj)
+        if notify_modified:
+            self._modified[key] = obj
+        idxs = set(idxs or [])
+        queued = self._objects.get(key)
+        if queued is not None:
+            # N.B. an empty set reindexes all indexes
+            idxs = queued[1] | idxs if queued[1] and idxs else set()
+        self._objects[key] = (obj, idxs)
+
+    def register_hook(self):
+        """Flush the queue before the current transaction commits
+
+        N.B. The hook is registered only once per transaction
+        """
+        txn = transaction.get()
+        if txn is self._transaction:
+            return
+        txn.addBeforeCommitHook(self.flush)
+        self._transaction = txn
+
+    def flush(self):
+        """Reindex all queued objects and notify the modified events
+
+        :returns: Number of reindexed objects
+        """
+        queued = list(self._objects.values())
+        notify = list(self._modified.values())
+        self._objects.clear()
+        self._modified.clear()
+        for obj, idxs in queued:
+            obj.reindexObject(idxs=list(idxs))
+        # process the catalog operations that were queued by the transitions
+        # and event handlers, so that the catalogs are up to date
+        processQueue()
+        # N.B. event handlers see the updated catalogs
+        for obj in notify:
+            modified(obj)
+        return len(queued)
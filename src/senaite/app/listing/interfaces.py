@@ -54,6 +54,9 @@ class IAjaxListingView(Interface):
 class IListingViewAdapter(Interface):
     """Marker that allows to modify the behavior of ListingView
     """
+    folder_item_columns = Attribute(
+        "Optional list of column keys filled by `folder_item`. The adapter "
+        "is skipped if none of these columns is visible in the listing")
 
     def before_render(self):
         """Before render hook
@@ -103,3 +106,11 @@ class IListingTransitions(Interface):
     def get_transitions(uids):
         """Returns all possible transitions for the given UIDs
         """
+
+    def get_transitions_by_uid(uids):
+        """Returns the transition IDs of each UID and all possible transitions
+        """
+
+    def get_custom_transitions(uids):
+        """Returns the custom transitions for the given UIDs
+        """
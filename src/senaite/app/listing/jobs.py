@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.APP.LISTING.
+#
+# SENAITE.APP.LISTING is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2024 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import threading
+import time
+import uuid
+
+import transaction
+import Zope2
+from AccessControl.SecurityManagement import newSecurityManager
+from AccessControl.SecurityManagement import noSecurityManager
+from bika.lims import api
+from bika.lims import logger
+from BTrees.OOBTree import OOBTree
+from persistent.mapping import PersistentMapping
+from six.moves import queue
+from Testing.makerequest import makerequest
+from zope.annotation.interfaces import IAnnotations
+from zope.component.hooks import setSite
+from zope.globalrequest import clearRequest
+from zope.globalrequest import setRequest
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+# annotation key of the job records on the portal
+JOBS_STORAGE = "senaite.app.listing.jobs"
+
+# seconds to keep the records of finished jobs
+JOBS_MAX_AGE = 7 * 24 * 3600
+
+# seconds without progress after which a queued or running job is considered
+# lost, e.g. because the ZEO client that queued it was restarted
+JOBS_TIMEOUT = 30 * 60
+
+
+def get_job_storage(portal=None):
+    """Returns the persistent job records of the portal
+
+    N.B. The records are stored in the ZODB, so that the progress of a job
+         can be polled from any ZEO client and not only from the one that
+         runs the job.
+
+    :param portal: The portal object
+    :returns: OOBTree of job ID -> record
+    """
+    if portal is None:
+        portal = api.get_portal()
+    annotations = IAnnotations(portal)
+    storage = annotations.get(JOBS_STORAGE)
+    if storage is None:
+        storage = annotations[JOBS_STORAGE] = OOBTree()
+    return storage
+
+
+def get_job(job_id, portal=None):
+    """Returns the record of the job with the given ID
+
+    :param job_id: The ID of the job
+    :param portal: The portal object
+    :returns: The job record or None
+    """
+    if not job_id:
+        return None
+    annotations = IAnnotations(portal or api.get_portal())
+    storage = annotations.get(JOBS_STORAGE)
+    if storage is None:
+        return None
+    return storage.get(job_id)
+
+
+def is_job_done(record):
+    """Checks if the job of the record is no longer processed
+    """
+    return record["state"] in (FINISHED, FAILED)
+
+
+def is_job_stale(record, now=None):
+    """Checks if the job of the record made no progress for `JOBS_TIMEOUT`
+
+    N.B. Jobs are queued in the memory of a single ZEO client, therefore the
+         records of jobs lost on a restart or crash are never updated again
+
+    :param record: The job record
+    :param now: The current time in seconds since the epoch
+    :returns: True if the job is not done and considered lost
+    """
+    if is_job_done(record):
+        return False
+    if now is None:
+        now = time.time()
+    updated = record.get("updated") or record["created"]
+    return now - updated > JOBS_TIMEOUT
+
+
+def get_job_progress(record):
+    """Returns the progress of the job record
+
+    N.B. Stale jobs are reported as failed
+
+    :param record: The job record
+    :returns: JSON serializable dictionary
+    """
+    state = record["state"]
+    message = record["message"]
+    if is_job_stale(record):
+        state = FAILED
+        message = "The job was interrupted"
+    return {
+        "job_id": record["job_id"],
+        "state": state,
+        "transition": record["transition"],
+        "total": record["total"],
+        "processed": record["processed"],
+        "errors": dict(record["errors"]),
+        "redirects": dict(record["redirects"]),
+        "message": message,
+        "created": record["created"],
+        "finished": record["finished"],
+    }
+
+
+class TransitionJob(object):
+    """Workflow transition of many objects that runs in a background thread
+
+    The job remembers the listing view class, the context and the user of
+    the request that enqueued it, so that the worker can run the very same
+    `IListingWorkflowTransition` adapters with its own ZODB connection.
+
+    N.B. The job itself is only queued in the memory of the ZEO client that
+         enqueued it and is lost on a restart. Its record is then considered
+         stale after `JOBS_TIMEOUT` and marked as failed.
+    """
+
+    def __init__(self, view, uids, transition):
+        self.id = uuid.uuid4().hex
+        self.uids = list(uids)
+        self.transition = transition
+        self.user_id = api.get_current_user().getId()
+        self.portal_path = api.get_path(api.get_portal())
+        self.context_path = api.get_path(view.context)
+        self.view_class = view.__class__
+        self.environ = {
+            "SERVER_NAME": view.request.get("SERVER_NAME", "localhost"),
+            "SERVER_PORT": view.request.get("SERVER_PORT", "80"),
+        }
+
+    def create_record(self):
+        """Store the record of the job with the current transaction
+
+        :returns: The job record
+        """
+        storage = get_job_storage()
+        now = time.time()
+        for job_id, record in list(storage.items()):
+            # mark the records of lost jobs as failed
+            if is_job_stale(record, now=now):
+                record["state"] = FAILED
+                record["message"] = "The job was interrupted"
+                record["finished"] = now
+            # forget the records of old finished jobs
+            if is_job_done(record) and now - record["finished"] > JOBS_MAX_AGE:
+                del storage[job_id]
+        record = storage[self.id] = PersistentMapping({
+            "job_id": self.id,
+            "user_id": self.user_id,
+            "state": QUEUED,
+            "transition": self.transition,
+            "total": len(self.uids),
+            "processed": 0,
+            "errors": {},
+            "redirects": {},
+            "affected_uids": list(self.uids),
+            "message": "",
+            "created": now,
+            "updated": now,
+            "finished": None,
+        })
+        return record
+
+    def run(self):
+        """Transition the objects with a separate ZODB connection
+        """
+        root = Zope2.app()
+        try:
+            app = makerequest(root, environ=self.environ)
+            request = app.REQUEST
+            setRequest(request)
+            portal = app.unrestrictedTraverse(self.portal_path)
+            setSite(portal)
+            self.login(portal)
+            record = get_job(self.id, portal)
+            if record is None:
+                raise KeyError("No record of job {}".format(self.id))
+            if record["state"] != QUEUED or is_job_stale(record):
+                # the job was already reported as failed to the client
+                logger.warn("Skipping the stale job {}".format(self.id))
+                if not is_job_done(record):
+                    self.set_failed(root, "The job was interrupted")
+                return
+            context = portal.unrestrictedTraverse(self.context_path)
+            view = self.view_class(context, request)
+            view.update()
+            record["state"] = RUNNING
+            record["updated"] = time.time()
+            transaction.commit()
+            for chunk in view.get_transition_chunks(self.uids):
+                self.run_chunk(view, record, chunk)
+            record["state"] = FINISHED
+            record["finished"] = record["updated"] = time.time()
+            transaction.commit()
+        except Exception as exc:
+            transaction.abort()
+            logger.exception("Transition job {} failed".format(self.id))
+            self.set_failed(root, "{}: {}".format(type(exc).__name__, exc))
+        finally:
+            noSecurityManager()
+            setSite(None)
+            clearRequest()
+            root._p_jar.close()
+
+    def run_chunk(self, view, record, uids):
+        """Transition and commit a chunk of objects
+
+        N.B. The progress is stored in the same transaction as the chunk
+
+        :param view: The listing view instance of the worker
+        :param record: The job record
+        :param uids: UIDs of the objects to transition
+        """
+        errors, redirects, affected_uids = view.do_transitions_for(
+            uids, self.transition)
+        self.update_record(record, uids, errors, redirects, affected_uids)
+        conflicts = view.commit_transitions(uids, self.transition)
+        if conflicts:
+            # the chunk was aborted, only record the conflicts
+            self.update_record(record, uids, conflicts)
+            transaction.commit()
+
+    def update_record(self, record, uids, errors, redirects=None,
+                      affected_uids=None):
+        """Update the progress of the job record
+
+        :param record: The job record
+        :param uids: UIDs of the processed objects
+        :param errors: Mapping of UID -> error message
+        :param redirects: Mapping of UID -> redirect URL
+        :param affected_uids: UIDs of all objects affected by the transitions
+        """
+        # N.B. the values are replaced to mark the record as changed
+        record["errors"] = dict(record["errors"], **errors)
+        record["redirects"] = dict(record["redirects"], **(redirects or {}))
+        affected = set(record["affected_uids"]).union(affected_uids or [])
+        record["affected_uids"] = list(affected)
+        record["processed"] = record["processed"] + len(uids)
+        record["updated"] = time.time()
+
+    def set_failed(self, root, message):
+        """Mark the job record as failed
+        """
+        try:
+            portal = root.unrestrictedTraverse(self.portal_path)
+            record = get_job(self.id, portal)
+            if record is None:
+                return
+            record["state"] = FAILED
+            record["message"] = message
+            record["finished"] = record["updated"] = time.time()
+            transaction.commit()
+        except Exception:
+            transaction.abort()
+            logger.exception("Failed to update the record of job {}"
+                             .format(self.id))
+
+    def login(self, portal):
+        """Run the job with the security context of the enqueuing user
+        """
+        acl_users = portal.acl_users
+        user = acl_users.getUserById(self.user_id)
+        if user is None:
+            # e.g. the Zope admin user
+            acl_users = portal.getPhysicalRoot().acl_users
+            user = acl_users.getUserById(self.user_id)
+        if user is None:
+            raise ValueError("User '{}' not found".format(self.user_id))
+        newSecurityManager(None, user.__of__(acl_users))
+
+
+class JobQueue(object):
+    """Process-local job queue that is processed by a single worker thread
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def enqueue(self, job):
+        """Store the record of the job and queue it once the current
+        transaction is committed
+
+        N.B. The job is only queued after the commit, so that the worker
+             finds its record and a retried request does not queue it twice
+
+        :param job: The job to process
+        :returns: The record of the job
+        """
+        record = job.create_record()
+        transaction.get().addAfterCommitHook(self.queue_job, args=(job, ))
+        return record
+
+    def queue_job(self, status, job):
+        """After commit hook that passes the job to the worker
+        """
+        if not status:
+            return
+        self._queue.put(job)
+        self.start()
+
+    def start(self):
+        """Start the worker thread unless it is already running
+        """
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self.work, name="senaite.app.listing.jobs")
+            self._worker.daemon = True
+            self._worker.start()
+
+    def work(self):
+        """Process the queued jobs one by one
+        """
+        while True:
+            job = self._queue.get()
+            try:
+                job.run()
+            except Exception:
+                logger.exception("Failed to run job {}".format(job.id))
+            finally:
+                self._queue.task_done()
+
+
+# process-local queue of background transitions
+transition_jobs = JobQueue()
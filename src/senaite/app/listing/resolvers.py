@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.APP.LISTING.
+#
+# SENAITE.APP.LISTING is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2024 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+from bika.lims import api
+from bika.lims.utils import get_link
+
+UID_CATALOG = "uid_catalog"
+
+
+def get_from_attrs(obj, attrs, default=None):
+    """Get the value of a chain of attributes
+
+    This is the pre-parsed equivalent of `bika.lims.utils.getFromString`.
+
+    :param obj: The object to start from
+    :param attrs: List of attribute names, callables are called
+    :param default: Returned if no value was found
+    :returns: Value of the last attribute or default
+    """
+    value = obj
+    for attr in attrs:
+        value = api.safe_getattr(value, attr, default=None)
+        if not value:
+            break
+    return value or default
+
+
+class ColumnResolver(object):
+    """Resolves the value and the replace URL of a listing column
+
+    The `attr` and `replace_url` definitions of the column are parsed once.
+    """
+
+    def __init__(self, view, key, column):
+        self.view = view
+        self.key = key
+        self.attrs = (column.get("attr") or key).split(".")
+        replace_url = column.get("replace_url")
+        self.replace_url_attrs = replace_url.split(".") if replace_url else []
+
+    def get_value(self, item, default=None):
+        """Returns the value of the column for the given folderitem
+
+        :param item: The folderitem
+        :param default: Returned if no value was found
+        :returns: Column value
+        """
+        value = item.get(self.key, None)
+        if value:
+            return value
+        return get_from_attrs(item["obj"], self.attrs, default)
+
+    def get_replace(self, item):
+        """Returns a link to the replace URL of the column
+
+        :param item: The folderitem
+        :returns: HTML link or None
+        """
+        if not self.replace_url_attrs:
+            return None
+
+        value = get_from_attrs(item["obj"], self.replace_url_attrs)
+        if not value:
+            return None
+
+        url = self.view.url_or_path_to_url(value)
+        value = self.get_value(item) or value
+        return get_link(url, value=value)
+
+
+class TitleResolver(object):
+    """Resolves UIDs to titles
+
+    UIDs are collected first and resolved together with a single catalog
+    query on the first title lookup.
+    """
+
+    def __init__(self, catalog=UID_CATALOG):
+        self.catalog = catalog
+        # mapping of UID -> title
+        self.titles = {}
+        # collected UIDs that are not resolved yet
+        self.pending = set()
+
+    def add(self, value):
+        """Collect the UID(s) of the given value
+
+        :param value: UID or a list of UIDs
+        """
+        if isinstance(value, (list, tuple)):
+            for uid in value:
+                self.add(uid)
+        elif api.is_uid(value) and value not in self.titles:
+            self.pending.add(value)
+
+    def collect(self, brains, columns):
+        """Collect the UIDs of the metadata values of the given brains
+
+        :param brains: Catalog brains
+        :param columns: Metadata columns that contain UIDs
+        """
+        if not columns:
+            return
+        for brain in brains:
+            # do not access attributes of full objects
+            if not api.is_brain(brain):
+                continue
+            for column in columns:
+                self.add(getattr(brain, column, None))
+
+    def resolve(self):
+        """Resolve the titles of all collected UIDs with one catalog query
+        """
+        if not self.pending:
+            return
+        uids = list(self.pending)
+        self.pending.clear()
+        catalog = api.get_tool(self.catalog)
+        for brain in catalog(UID=uids):
+            self.titles[brain.UID] = brain.Title
+
+    def get_title(self, uid, default=""):
+        """Returns the title of the object with the given UID
+
+        :param uid: UID of the object
+        :param default: Returned if no object was found
+        :returns: Title of the object
+        """
+        if uid not in self.titles:
+            self.add(uid)
+            self.resolve()
+        if uid not in self.titles:
+            # not cataloged in the UID catalog
+            obj = api.get_object_by_uid(uid, None)
+            self.titles[uid] = api.get_title(obj) if obj else default
+        return self.titles[uid]
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.APP.LISTING.
+#
+# SENAITE.APP.LISTING is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2024 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import copy
+import json
+import re
+from json.encoder import _make_iterencode
+from json.encoder import c_make_encoder
+from json.encoder import encode_basestring_ascii
+
+import six
+from bika.lims import api
+from DateTime import DateTime
+from senaite.app.listing.cache import to_hashable
+from senaite.core.i18n import translate as t
+from zope.i18nmessageid import Message
+
+_marker = object()
+
+# Dictionary encode string values if at most this ratio of them is distinct
+MAX_CARDINALITY = 0.5
+
+# Column specific sub-mappings of a folderitem with HTML markup
+MARKUP_KEYS = ["replace", "before", "after"]
+
+
+def is_plain_string(thing):
+    """Checks if the thing is a string, but not an i18n message
+
+    N.B. i18n messages with the same msgid compare equal, even if their
+    mapping differs
+    """
+    if isinstance(thing, Message):
+        return False
+    return isinstance(thing, six.string_types)
+
+
+def to_relative_urls(folderitems, base_url):
+    """Replace the base URL in the item URLs and links with `~`
+
+    The `url` of the folderitems and the `href` attributes of their column
+    markup are expanded again by the listing app.
+
+    N.B. The folderitems are copied, so that server side consumers and the
+    `folderitem` hooks always work with absolute URLs
+
+    :param folderitems: List of folderitems
+    :param base_url: The URL to replace, e.g. the portal URL
+    :returns: List of folderitem copies with relative URLs
+    """
+    prefix = "{}/".format(base_url)
+    link = re.compile(r"""href=(["']){}""".format(re.escape(prefix)))
+
+    relative = []
+    for item in folderitems:
+        item = copy.copy(item)
+        url = dict.get(item, "url")
+        if is_plain_string(url) and url.startswith(prefix):
+            item["url"] = "~/{}".format(url[len(prefix):])
+        for key in MARKUP_KEYS:
+            markup = dict.get(item, key)
+            if not markup:
+                continue
+            markup = dict(markup)
+            for name, value in markup.items():
+                if is_plain_string(value) and prefix in value:
+                    markup[name] = link.sub(r"href=\1~/", value)
+            item[key] = markup
+        relative.append(item)
+    return relative
+
+
+def to_columnar(folderitems, max_cardinality=MAX_CARDINALITY):
+    """Encode the folderitems in a columnar format
+
+    The keys of all folderitems are sent once and the values of each item
+    positionally in a row. Columns of repeated strings, e.g. `review_state`
+    or `portal_type`, are dictionary encoded.
+
+    N.B. Keys which are not set on an item are listed by row in `missing`
+
+    :param folderitems: List of folderitems
+    :param max_cardinality: Maximum ratio of distinct values to encode
+    :returns: Dictionary with keys, dictionaries, rows and missing keys
+    """
+    keys = []
+    positions = {}
+    for item in folderitems:
+        for key in item.keys():
+            if key not in positions:
+                positions[key] = len(keys)
+                keys.append(key)
+
+    dictionaries = {}
+    lookups = {}
+    for key in keys:
+        values = [item[key] for item in folderitems if key in item]
+        if not all(map(is_plain_string, values)):
+            continue
+        distinct = sorted(set(values))
+        if len(distinct) > len(values) * max_cardinality:
+            continue
+        dictionaries[key] = distinct
+        lookups[key] = dict(map(reversed, enumerate(distinct)))
+
+    rows = []
+    missing = {}
+    for num, item in enumerate(folderitems):
+        row = []
+        for key in keys:
+            if key not in item:
+                missing.setdefault(num, []).append(positions[key])
+                row.append(None)
+                continue
+            value = item[key]
+            lookup = lookups.get(key)
+            if lookup is not None:
+                value = lookup[value]
+            row.append(value)
+        rows.append(row)
+
+    return {
+        "keys": keys,
+        "dictionaries": dictionaries,
+        "rows": rows,
+        "missing": missing,
+    }
+
+
+class ListingJSONEncoder(json.JSONEncoder):
+    """JSON encoder for listing data
+
+    i18n messages are translated when their string is encoded, `DateTime`
+    objects are converted to ISO8601 and brains or objects to UIDs.
+
+    N.B. i18n messages are unicode strings, which the encoder serializes
+         without calling `default`
+    """
+
+    def __init__(self, translate, **kw):
+        super(ListingJSONEncoder, self).__init__(**kw)
+        self.translate = translate
+
+    def encode_string(self, thing):
+        """Encode the string and translate it if it is an i18n message
+        """
+        if isinstance(thing, Message):
+            thing = self.translate(thing)
+        return encode_basestring_ascii(thing)
+
+    def default(self, thing):
+        """Convert the objects the JSON module can not serialize
+        """
+        # Convert `DateTime` objects to ISO8601 format
+        if isinstance(thing, DateTime):
+            return thing.ISO8601()
+        # Convert objects and brains to UIDs
+        if api.is_object(thing):
+            return api.get_uid(thing)
+        return str(thing)
+
+    def iterencode(self, o, _one_shot=False):
+        """Encode the data with the string encoder of this class
+        """
+        markers = {} if self.check_circular else None
+        if _one_shot and c_make_encoder is not None:
+            _iterencode = c_make_encoder(
+                markers, self.default, self.encode_string, None,
+                self.key_separator, self.item_separator, False,
+                self.skipkeys, self.allow_nan)
+        else:
+            _iterencode = _make_iterencode(
+                markers, self.default, self.encode_string, None,
+                float.__repr__, self.key_separator, self.item_separator,
+                False, self.skipkeys, _one_shot)
+        return _iterencode(o, 0)
+
+
+class ListingSerializer(object):
+    """Serializes listing data to JSON
+
+    The data is converted while it is encoded: i18n messages are translated,
+    `DateTime` objects converted to ISO8601 and brains or objects to UIDs.
+    Translations are memoized for the lifetime of the serializer.
+    """
+
+    def __init__(self, request=None):
+        if request is None:
+            request = api.get_request()
+        self.language = request.get("LANGUAGE", "") if request else ""
+        self.translations = {}
+
+    def translate(self, message):
+        """Translate the i18n message
+
+        :param message: i18n message
+        :returns: Translated string
+        """
+        try:
+            key = (message, message.domain, to_hashable(message.mapping),
+                   message.default, self.language)
+            translated = self.translations.get(key, _marker)
+        except TypeError:
+            # unhashable mapping
+            return t(message)
+        if translated is _marker:
+            translated = self.translations[key] = t(message)
+        return translated
+
+    def dumps(self, data):
+        """Returns the data as JSON string
+
+        :param data: Listing data, e.g. folderitems
+        :returns: JSON string
+        """
+        return json.dumps(data, cls=ListingJSONEncoder,
+                          translate=self.translate)
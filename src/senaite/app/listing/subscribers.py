@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.APP.LISTING.
+#
+# SENAITE.APP.LISTING is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2024 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+from bika.lims import api
+from senaite.app.listing.cache import review_state_title_cache
+from senaite.app.listing.cache import sort_key_index
+
+
+def invalidate_sort_keys(obj, event):
+    """Remove the indexed sort keys of the object
+
+    This handler is called when the object is modified, transitioned or
+    removed.
+    """
+    catalog_ids = sort_key_index.get_catalog_ids()
+    if not catalog_ids:
+        return
+    # N.B. the events are also fired for non-content objects, e.g. tools
+    if not api.is_object(obj):
+        return
+    path = api.get_path(obj)
+    for catalog_id in catalog_ids:
+        catalog = api.get_tool(catalog_id, default=None)
+        if catalog is None:
+            continue
+        rid = catalog.getrid(path)
+        if rid is None:
+            continue
+        sort_key_index.invalidate(catalog_id, rid)
+
+
+def clear_review_state_titles(event):
+    """Flush the translated review state titles
+
+    This handler is called when a Generic Setup profile was imported, because
+    the imported workflow definitions might have changed the state titles.
+    """
+    review_state_title_cache.clear()
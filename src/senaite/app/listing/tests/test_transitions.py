@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.APP.LISTING.
+#
+# SENAITE.APP.LISTING is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2024 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import unittest
+
+from senaite.app.listing.adapters.transitions import ListingTransitions
+
+
+class View(object):
+    """Listing view stub
+    """
+    review_state = {}
+    group_transitions_by_signature = True
+
+
+class TestListingTransitions(unittest.TestCase):
+
+    def setUp(self):
+        self.view = View()
+        self.adapter = ListingTransitions(self.view, None, None)
+        self.evaluated = []
+        self.rechecked = []
+
+        # two objects with the same signature
+        self.adapter.get_object_by_uid = lambda uid: uid
+        self.adapter.get_signature_key = lambda obj: ("Analysis", "assigned")
+
+        # the object specific guards differ, e.g. only the first object has a
+        # result to submit
+        transitions = {
+            "uid-1": [{"id": "submit"}, {"id": "deactivate"}],
+            "uid-2": [{"id": "deactivate"}],
+        }
+
+        def get_transitions_and_state(obj):
+            self.evaluated.append(obj)
+            return transitions[obj], None
+
+        def get_object_specific_transitions(obj, known=None):
+            self.rechecked.append(obj)
+            return filter(lambda t: t["id"] == "submit", transitions[obj])
+
+        self.adapter.get_transitions_and_state = get_transitions_and_state
+        self.adapter.get_object_specific_transitions = \
+            get_object_specific_transitions
+
+    def test_object_specific_guards_are_evaluated_per_object(self):
+        uids = ["uid-1", "uid-2"]
+        transitions = self.adapter.get_workflow_transitions(uids)
+        self.assertEqual(["deactivate"], map(lambda t: t["id"], transitions))
+        self.assertEqual(["uid-1"], self.evaluated)
+        self.assertEqual(["uid-2"], self.rechecked)
+
+    def test_transition_ids_by_uid(self):
+        uids = ["uid-1", "uid-2"]
+        tids_by_uid, transitions = self.adapter.get_transitions_by_uid(uids)
+        self.assertEqual(["submit", "deactivate"], tids_by_uid["uid-1"])
+        self.assertEqual(["deactivate"], tids_by_uid["uid-2"])
+        self.assertEqual(
+            ["submit", "deactivate"], map(lambda t: t["id"], transitions))
+
+    def test_signature_guards_are_evaluated_once(self):
+        uids = ["uid-1", "uid-2", "uid-1", "uid-2"]
+        self.adapter.get_workflow_transitions(uids)
+        self.assertEqual(["uid-1"], self.evaluated)
+        self.assertEqual(["uid-2", "uid-1", "uid-2"], self.rechecked)
+
+    def test_grouping_is_disabled_by_default(self):
+        self.view.group_transitions_by_signature = False
+        uids = ["uid-1", "uid-2"]
+        transitions = self.adapter.get_workflow_transitions(uids)
+        self.assertEqual(["deactivate"], map(lambda t: t["id"], transitions))
+        self.assertEqual(uids, self.evaluated)
+        self.assertEqual([], self.rechecked)
+
+
+def test_suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestListingTransitions))
+    return suite
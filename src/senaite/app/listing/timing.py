@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.APP.LISTING.
+#
+# SENAITE.APP.LISTING is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2018-2024 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import collections
+import time
+
+
+class Span(object):
+    """Measures the wall time of a named phase in a `with` statement
+    """
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timings.add(self.name, time.time() - self.start)
+
+
+class Timings(object):
+    """Accumulates the wall time of named phases of a request
+
+    Usage:
+
+        with self.timings.span("search"):
+            brains = self.search()
+    """
+
+    def __init__(self):
+        self.durations = collections.OrderedDict()
+
+    def span(self, name):
+        """Returns a context manager that measures the named phase
+
+        :param name: Name of the phase, e.g. "search"
+        :returns: Span
+        """
+        return Span(self, name)
+
+    def add(self, name, duration):
+        """Add the duration to the named phase
+
+        :param name: Name of the phase
+        :param duration: Duration in seconds
+        """
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+
+    def to_dict(self):
+        """Returns the durations of the phases in milliseconds
+        """
+        return dict(map(lambda item: (item[0], round(item[1] * 1000, 3)),
+                        self.durations.items()))
+
+    def to_header(self):
+        """Returns the durations as `Server-Timing` header value
+        """
+        return ", ".join(map(lambda item: "{};dur={:.1f}".format(
+            item[0], item[1] * 1000), self.durations.items()))
+
+    def __nonzero__(self):
+        return bool(self.durations)
+
+
+class Profiler(object):
+    """Accumulates the wall time and the number of calls per function
+
+    The functions are grouped by category, e.g. "column" or "adapter".
+    """
+
+    def __init__(self):
+        self.durations = collections.defaultdict(float)
+        self.calls = collections.defaultdict(int)
+
+    def wrap(self, category, name, func):
+        """Wrap the function to measure its calls
+
+        :param category: Category of the function, e.g. "column"
+        :param name: Name of the function within the category
+        :param func: The function to wrap
+        :returns: Wrapped function
+        """
+        key = (category, name)
+
+        def wrapper(*args, **kw):
+            start = time.time()
+            try:
+                return func(*args, **kw)
+            finally:
+                self.durations[key] += time.time() - start
+                self.calls[key] += 1
+        return wrapper
+
+    def get_ranking(self):
+        """Returns the measured functions sorted by their total wall time
+
+        :returns: List of dictionaries with category, name, time in
+                  milliseconds and number of calls
+        """
+        ranking = sorted(self.durations.items(),
+                         key=lambda item: item[1], reverse=True)
+        return map(lambda item: {
+            "category": item[0][0],
+            "name": item[0][1],
+            "time": round(item[1] * 1000, 3),
+            "calls": self.calls[item[0]],
+        }, ranking)
+
+    def log(self, logger):
+        """Log the ranking of the measured functions
+
+        :param logger: The logger to use
+        """
+        for entry in self.get_ranking():
+            logger.info(u"Profile: {time:.1f}ms in {calls} calls of "
+                        u"{category} '{name}'".format(**entry))
@@ -20,9 +20,13 @@
 
 import collections
 import copy
+import functools
+import hashlib
+import heapq
+import itertools
+import operator
 import re
 import time
-from functools import cmp_to_key
 
 import six
 
@@ -37,19 +41,33 @@ from bika.lims.utils import getFromString
 from plone.memoize import view
 from plone.protect.utils import addTokenToUrl
 from Products.CMFPlone.utils import safe_unicode
+from Products.ZCatalog.Lazy import LazyMap
 from Products.Five.browser.pagetemplatefile import ViewPageTemplateFile
 from senaite.app.listing.ajax import AjaxListingView
+from senaite.app.listing.cache import review_state_title_cache
+from senaite.app.listing.cache import search_results_cache
+from senaite.app.listing.cache import searchable_text_cache
+from senaite.app.listing.cache import sort_key_index
+from senaite.app.listing.cache import to_hashable
+from senaite.app.listing.folderitem import FolderItem
 from senaite.app.listing.interfaces import IListingView
 from senaite.app.listing.interfaces import IListingViewAdapter
+from senaite.app.listing.interfaces import ITransposedListingView
+from senaite.app.listing.resolvers import ColumnResolver
+from senaite.app.listing.resolvers import TitleResolver
+from senaite.app.listing.timing import Profiler
 from senaite.app.supermodel import SuperModel
 from senaite.core.api.catalog import to_searchable_text_qs
 from senaite.core.catalog import ANALYSIS_CATALOG
 from senaite.core.catalog import AUDITLOG_CATALOG
 from senaite.core.catalog import SAMPLE_CATALOG
 from senaite.core.catalog import WORKSHEET_CATALOG
+from senaite.core.registry import get_registry_record
 from zope.component import subscribers
 from zope.interface import implements
 
+_marker = object()
+
 
 class ListingView(AjaxListingView):
     """Base Listing View
@@ -151,6 +169,16 @@ class ListingView(AjaxListingView):
     # Automatically fetch all possible transitions for selected items.
     fetch_transitions_on_select = True
 
+    # Number of objects the listing app transitions per request
+    transition_chunk_size = 10
+
+    # Number of selected objects from which on transitions are processed by a
+    # background job and the progress is polled. Disabled if set to 0.
+    background_transition_threshold = 0
+
+    # Number of objects a background job transitions per transaction
+    background_transition_chunk_size = 50
+
     # Submit transitions via ajax
     enable_ajax_transitions = None
 
@@ -180,6 +208,42 @@ class ListingView(AjaxListingView):
     # Manually sort brains by this criteria
     manual_sort_on = None
 
+    # Sort criteria without a sortable catalog index, for which the sort keys
+    # are kept in a process-local index to avoid waking up the objects on
+    # every manual sort.
+    # N.B. Indexed sort keys are invalidated when the object is modified
+    sort_key_index_columns = []
+
+    # Metadata columns that contain the UIDs of referenced objects. Their
+    # titles are resolved with a single catalog query for all brains of the
+    # request, e.g. to search the metadata or in the `folderitem` hook.
+    uid_reference_columns = []
+
+    # Cache the record IDs of the catalog results until the catalog changes.
+    # N.B. Only batched results are cached, see `batch_search`. Cached results
+    #      are shared between users with the same roles and groups
+    cache_search_results = False
+
+    # Pass the batch parameters `b_start` and `b_size` to the catalog query to
+    # fetch only the brains of the current page.
+    # N.B. All brains are fetched if the results need to be filtered
+    #      (`isItemAllowed`) or sorted (`manual_sort_on`) manually
+    batch_search = True
+
+    # Answer repeated folderitems requests with "304 Not Modified" until the
+    # catalog changes.
+    # N.B. Only enable this if the folderitems depend on catalog data only
+    conditional_folderitems = False
+
+    # Evaluate the transition guards only once for all selected objects with
+    # the same signature (portal_type, review_state). Object specific guards,
+    # e.g. of `submit` or `verify`, are still evaluated for each object.
+    group_transitions_by_signature = False
+
+    # Send the allowed transition IDs of each folderitem, so that the listing
+    # app can calculate the transitions of selected items without a request
+    include_transition_ids = False
+
     # Render the search box in the upper right corner
     show_search = True
 
@@ -217,12 +281,22 @@ class ListingView(AjaxListingView):
             self.contentFilter.update(self.get_path_query())
 
         self.total = 0
+        # flag if the total is a lower bound of the matching brains
+        self.total_is_estimate = False
         self.limit_from = 0
         self.show_more = False
 
         # Internal cache for translated state titles
         self.state_titles = {}
 
+        # Resolves UIDs to titles with a single catalog query, e.g. in the
+        # `folderitem` hook: `self.title_resolver.get_title(uid)`
+        self.title_resolver = TitleResolver()
+
+        # Keys of the deferred columns to compute in this request or None if
+        # the deferred columns are loaded in a second request
+        self.deferred_columns = None
+
         # TODO: Refactor to a view memoized property
         # Internal cache for alert icons
         self.field_icons = {}
@@ -323,6 +397,20 @@ class ListingView(AjaxListingView):
         return sorted(adapters, key=lambda ad: api.to_float(
             getattr(ad, "priority_order", 1000)))
 
+    def get_folder_item_adapters(self):
+        """Returns the subscriber adapters to call for each folderitem
+
+        Adapters declaring the columns they fill in `folder_item_columns` are
+        skipped if none of these columns is visible.
+        """
+        adapters = []
+        for adapter in self.get_listing_view_adapters():
+            columns = getattr(adapter, "folder_item_columns", None)
+            if columns and not any(map(self.is_column_visible, columns)):
+                continue
+            adapters.append(adapter)
+        return adapters
+
     def contents_table(self, *args, **kwargs):
         """Render the ReactJS enabled contents table template
         """
@@ -370,6 +458,58 @@ class ListingView(AjaxListingView):
         self.request["%s_review_state" % self.form_id] = review_state["id"]
         return review_state
 
+    def get_visible_columns(self):
+        """Returns the column keys requested by the listing app
+
+        :returns: List of visible column keys or None if all columns are
+                  requested
+        """
+        # transposed listings render other columns than defined
+        if ITransposedListingView.providedBy(self):
+            return None
+        key = "{}_columns".format(self.get_form_id())
+        columns = self.request.form.get(key)
+        if not isinstance(columns, (list, tuple)):
+            return None
+        return columns
+
+    def is_column_visible(self, key):
+        """Checks if the column is visible in the listing app
+
+        :param key: The column key
+        :returns: True if the values of the column need to be resolved
+        """
+        columns = self.get_visible_columns()
+        if columns is None:
+            return True
+        return key in columns
+
+    def is_column_deferred(self, key):
+        """Checks if the cells of the column are loaded in a second request
+
+        N.B. Columns are deferred with `"deferred": True` in their definition.
+        The `folderitem` hook can use this method to skip the expensive
+        computation of these cells in the first request.
+
+        Columns are only deferred if the listing app requests the deferred
+        cells in a second request, which it announces with `defer_columns`.
+
+        :param key: The column key
+        :returns: True if the cells of the column are not computed now
+        """
+        if self.deferred_columns is not None:
+            return False
+        form_key = "{}_defer_columns".format(self.get_form_id())
+        if not self.request.form.get(form_key, False):
+            return False
+        # transposed listings render other columns than defined
+        if ITransposedListingView.providedBy(self):
+            return False
+        column = self.columns.get(key) or {}
+        if not column.get("deferred", False):
+            return False
+        return self.is_column_visible(key)
+
     def get_review_state(self, state_id):
         """Returns the review state definition for the given state id or None
         """
@@ -439,14 +579,66 @@ class ListingView(AjaxListingView):
         catalog = self.get_catalog()
         return catalog.schema()
 
+    @view.memoize
+    def get_language(self):
+        """Returns the current negotiated language
+
+        :returns: Language code, e.g. "en"
+        """
+        return self.request.get("LANGUAGE", "")
+
+    @view.memoize
+    def get_workflow_version(self, portal_type):
+        """Returns a version of the workflow definitions bound to the type
+
+        The version changes when the workflow definitions are modified, e.g.
+        when they are imported by another ZEO client.
+
+        N.B. The state titles are stored in the state definitions, which are
+             persisted separately from the workflow and the states container.
+             They are loaded first, because the modification time of ghosts,
+             e.g. after an invalidation by another ZEO client, is unknown.
+
+        :param portal_type: The portal type
+        :returns: Tuple of workflow ID and modification time pairs
+        """
+        wf_tool = api.get_tool("portal_workflow")
+        version = []
+        for wf_id in wf_tool.getChainForPortalType(portal_type):
+            wf = wf_tool.getWorkflowById(wf_id)
+            if wf is None:
+                continue
+            definitions = [wf]
+            states = getattr(wf, "states", None)
+            if states is not None:
+                definitions.append(states)
+                definitions.extend(states.objectValues())
+            mtimes = []
+            for obj in definitions:
+                activate = getattr(obj, "_p_activate", None)
+                if activate is not None:
+                    activate()
+                mtimes.append(getattr(obj, "_p_mtime", None) or 0)
+            version.append((wf_id, max(mtimes)))
+        return tuple(version)
+
     @view.memoize
     def translate_review_state(self, state, portal_type):
         """Translates the review state to the current set language
 
+        The translated titles are cached process-wide by the workflow version,
+        state, portal type and language.
+
         :param state: Review state title
         :type state: basestring
         :returns: Translated review state title
         """
+        key = (self.get_workflow_version(portal_type), state, portal_type,
+               self.get_language())
+        translated_state = review_state_title_cache.get(key)
+        if translated_state is not None:
+            return translated_state
+
         ts = api.get_tool("translation_service")
         wf = api.get_tool("portal_workflow")
         state_title = wf.getTitleForStateOnType(state, portal_type)
@@ -454,6 +646,7 @@ class ListingView(AjaxListingView):
             _(state_title or state), context=self.request)
         logger.debug(u"ListingView:translate_review_state: {} -> {} -> {}"
                     .format(state, state_title, translated_state))
+        review_state_title_cache.set(key, translated_state)
         return translated_state
 
     def metadata_to_searchable_text(self, brain, key, value):
@@ -469,7 +662,7 @@ class ListingView(AjaxListingView):
         if value is Missing.Value:
             return u""
         if api.is_uid(value):
-            return api.get_title(value)
+            return self.title_resolver.get_title(value)
         if isinstance(value, (bool)):
             return u""
         if isinstance(value, (list, tuple)):
@@ -595,7 +788,7 @@ class ListingView(AjaxListingView):
         return {
             "obj": brain_or_object,
             "uid": api.get_uid(brain_or_object),
-            "url": api.get_url(brain_or_object),
+            "url": self.path_to_url(api.get_path(brain_or_object)),
             "id": api.get_id(brain_or_object),
             "title": api.get_title(brain_or_object),
             "portal_type": api.get_portal_type(brain_or_object),
@@ -651,11 +844,16 @@ class ListingView(AjaxListingView):
             return re.compile(searchterm, re.IGNORECASE)
         return re.compile(searchterm)
 
-    def sort_brains(self, brains, sort_on=None, instance_fallback=True):
+    def sort_brains(self, brains, sort_on=None, instance_fallback=True,
+                    limit=None):
         """Sort the brains
 
+        The sort key of each brain is extracted exactly once before sorting.
+        If a limit is given, only the first `limit` brains are sorted.
+
         :param brains: List of catalog brains
         :param sort_on: The metadata column name to sort on
+        :param limit: Number of leading brains needed from the sorted result
         :returns: Manually sorted list of brains
         """
         wakeup = False
@@ -665,9 +863,10 @@ class ListingView(AjaxListingView):
                 .format(sort_on))
             if not instance_fallback:
                 return brains
-            logger.warn(
-                "ListingView::sort_brains: !!! WAKING UP {} OBJECTS !!!"
-                .format(len(brains)))
+            if sort_on not in self.sort_key_index_columns:
+                logger.warn(
+                    "ListingView::sort_brains: !!! WAKING UP {} OBJECTS !!!"
+                    .format(len(brains)))
             wakeup = True
 
         logger.warn(
@@ -678,26 +877,72 @@ class ListingView(AjaxListingView):
         # calculate the sort_order
         reverse = self.get_sort_order() == "descending"
 
+        # extract the sort keys
+        start = time.time()
+        decorated = [(self.get_sort_key(brain, sort_on, wakeup=wakeup), brain)
+                     for brain in brains]
+        extracted = time.time()
+
         # added for Python 3 compatibility
-        def cmp(a, b):
-            return (a > b) - (a < b)
-
-        def metadata_sort(a, b):
-            if wakeup:
-                a = SuperModel(a)
-                b = SuperModel(b)
-            # get the attribute from the brain or SuperModel
-            a = getattr(a, sort_on, "")
-            b = getattr(b, sort_on, "")
-            # check for callable
-            if callable(a):
-                a = a()
-            if callable(b):
-                b = b()
-            # Compare the two values
-            return cmp(a, b)
-
-        return sorted(brains, key=cmp_to_key(metadata_sort), reverse=reverse)
+        # N.B. only the keys are compared to keep the sort stable
+        key = operator.itemgetter(0)
+        if limit is not None and limit < len(decorated):
+            if reverse:
+                decorated = heapq.nlargest(limit, decorated, key=key)
+            else:
+                decorated = heapq.nsmallest(limit, decorated, key=key)
+        else:
+            decorated = sorted(decorated, key=key, reverse=reverse)
+        end = time.time()
+
+        self.runtime_info["sort_brains"] = {
+            "sort_on": sort_on,
+            "count": len(brains),
+            "limit": limit,
+            "wakeup": wakeup,
+            "key_extraction": extracted - start,
+            "sort": end - extracted,
+        }
+        logger.info(
+            u"ListingView::sort_brains: Extracted {} sort keys in {:.2f}s, "
+            u"sorted in {:.2f}s".format(
+                len(brains), extracted - start, end - extracted))
+
+        return [brain for sort_key, brain in decorated]
+
+    def get_sort_key(self, brain, sort_on, wakeup=False):
+        """Get the value to sort the brain on
+
+        Sort keys of criteria listed in `sort_key_index_columns` are looked up
+        in the process-local sort key index first.
+
+        :param brain: Catalog brain
+        :param sort_on: The attribute name to sort on
+        :param wakeup: Get the attribute from the object instead of the brain
+        :returns: Sort key of the brain
+        """
+        indexed = sort_on in self.sort_key_index_columns
+        if indexed:
+            rid = brain.getRID()
+            modified = getattr(brain, "modified", None)
+            key = sort_key_index.get(
+                self.catalog, sort_on, rid, modified=modified, default=_marker)
+            if key is not _marker:
+                return key
+
+        obj = brain
+        if wakeup:
+            obj = SuperModel(brain)
+        # get the attribute from the brain or SuperModel
+        value = getattr(obj, sort_on, "")
+        # check for callable
+        if callable(value):
+            value = value()
+
+        if indexed:
+            sort_key_index.set(
+                self.catalog, sort_on, rid, value, modified=modified)
+        return value
 
     def get_searchterm(self):
         """Get the user entered search value from the request
@@ -721,25 +966,70 @@ class ListingView(AjaxListingView):
         logger.info(u"ListingView::search: Prepare metadata query for '{}'"
                     .format(self.catalog))
 
-        brains = catalog(query)
+        brains = self.query_catalog(catalog, query)
 
         # Build a regular expression for the given searchterm
         regex = self.make_regex_for(searchterm, ignorecase=ignorecase)
 
-        # Get the catalog metadata columns
-        columns = self.get_metadata_columns()
+        # N.B. `^` and `$` match at each metadata value of the searchable text
+        regex = re.compile(regex.pattern, regex.flags | re.MULTILINE)
 
-        # Filter predicate to match each metadata value against the searchterm
-        def match(brain):
-            for column in columns:
-                value = getattr(brain, column, None)
-                parsed = self.metadata_to_searchable_text(brain, column, value)
-                if regex.search(parsed):
-                    return True
-            return False
+        # cache keys of the searchable texts
+        keys = map(self.get_searchable_text_key, brains)
+
+        # Resolve the referenced UIDs of all uncached brains at once
+        uncached = [brain for brain, key in zip(brains, keys)
+                    if key not in searchable_text_cache]
+        self.title_resolver.collect(uncached, self.uid_reference_columns)
 
         # Filtered brains by searchterm -> metadata match
-        return filter(match, brains)
+        brains = [brain for brain, key in zip(brains, keys)
+                  if regex.search(self.get_searchable_text(brain, key=key))]
+
+        stats = searchable_text_cache.get_stats()
+        self.runtime_info["searchable_text_cache"] = stats
+        logger.info(u"ListingView::metadata_search: Searchable text cache "
+                    u"{hits} hits, {misses} misses, {size} entries"
+                    .format(**stats))
+        return brains
+
+    def get_searchable_text(self, brain, key=None):
+        """Returns the searchable text of all metadata values of the brain
+
+        The text is cached by the record ID and the modification date of the
+        brain and the current language.
+
+        :param brain: ZCatalog Brain
+        :param key: The cache key of the brain if already computed
+        :returns: Newline separated searchable text of all metadata columns
+        """
+        if key is None:
+            key = self.get_searchable_text_key(brain)
+        text = searchable_text_cache.get(key)
+        if text is not None:
+            return text
+
+        values = []
+        for column in self.get_metadata_columns():
+            value = getattr(brain, column, None)
+            parsed = self.metadata_to_searchable_text(brain, column, value)
+            values.append(safe_unicode(parsed or u""))
+        text = u"\n".join(values)
+
+        searchable_text_cache.set(key, text)
+        return text
+
+    def get_searchable_text_key(self, brain):
+        """Returns the cache key for the searchable text of the brain
+
+        :param brain: ZCatalog Brain
+        :returns: Hashable cache key
+        """
+        modified = getattr(brain, "modified", None)
+        if self.is_date(modified):
+            modified = modified.millis()
+        return (self.__class__, self.catalog, brain.getRID(), modified,
+                self.get_language())
 
     def text_index_search(self, catalog, index, query, searchterm):
         """Searches given catalog by query and also looks for a keyword in the
@@ -756,19 +1046,93 @@ class ListingView(AjaxListingView):
         searchterm = searchterm.replace('"', '')
         searchterm = api.safe_unicode(searchterm).encode("utf-8")
         query[index] = searchterm
-        return catalog(query)
+        return self.query_catalog(catalog, query)
+
+    def query_catalog(self, catalog, query):
+        """Query the catalog
+
+        If `cache_search_results` is set, the record IDs of batched results
+        are cached until the catalog changes.
+
+        N.B. Unbatched results are not cached, because this would wake up the
+             brains of all matching records
+
+        :param catalog: ZCatalog tool
+        :param query: Catalog query
+        :returns: Catalog results
+        """
+        b_size = query.get("b_size")
+        if not self.cache_search_results or not b_size:
+            return catalog(query)
+
+        key = self.get_search_results_cache_key(catalog, query)
+        if key is None:
+            return catalog(query)
+
+        cached = search_results_cache.get(key)
+        if cached is not None:
+            rids, count = cached
+            return LazyMap(catalog._catalog.__getitem__, rids, len(rids),
+                           actual_result_count=count)
+
+        results = catalog(query)
+        # N.B. catalogs that do not support batching return all brains
+        if len(results) > b_size:
+            return results
+        rids = [brain.getRID() for brain in results]
+        search_results_cache.set(key, (rids, self.get_result_count(results)))
+        return results
+
+    def get_search_results_cache_key(self, catalog, query):
+        """Returns the cache key for the results of the catalog query
+
+        The key contains the change counter of the catalog and the roles and
+        groups of the current user, which are added by the catalog to filter
+        the results.
+
+        :param catalog: ZCatalog tool
+        :param query: Catalog query
+        :returns: Hashable cache key or None if the results can not be cached
+        """
+        get_counter = getattr(catalog, "getCounter", None)
+        list_allowed = getattr(catalog, "_listAllowedRolesAndUsers", None)
+        if get_counter is None or list_allowed is None:
+            return None
+        user = getSecurityManager().getUser()
+        allowed = tuple(sorted(list_allowed(user)))
+        return (catalog.getId(), get_counter(), allowed, to_hashable(query))
+
+    def get_etag(self):
+        """Returns the ETag of the folderitems for the current request
+
+        The ETag is computed from the request payload, the change counter of
+        the catalog, the roles and groups of the current user and the language.
+
+        :returns: Quoted ETag or None if conditional requests are disabled
+        """
+        if not self.conditional_folderitems:
+            return None
+        catalog = self.get_catalog()
+        key = self.get_search_results_cache_key(catalog, self.get_json())
+        if key is None:
+            return None
+        key += (
+            self.__class__.__module__,
+            self.__class__.__name__,
+            api.get_path(self.context),
+            self.get_language(),
+        )
+        return '"{}"'.format(hashlib.md5(repr(key)).hexdigest())
 
     def _fetch_brains(self, idxfrom=0):
         """Fetch the catalog results for the current listing table state
         """
 
         searchterm = self.get_searchterm()
-        brains = self.search(searchterm=searchterm)
-        self.total = len(brains)
-
-        # Return a subset of results, if necessary
-        if idxfrom and len(brains) > idxfrom:
-            return brains[idxfrom:self.pagesize + idxfrom]
+        # fetch one more brain to know if there are more items to show
+        brains = self.search(
+            searchterm=searchterm, b_start=idxfrom, b_size=self.pagesize + 1)
+        self.show_more = len(brains) > self.pagesize
         return brains[:self.pagesize]
 
     def get_search_index(self, catalog):
@@ -793,16 +1157,18 @@ class ListingView(AjaxListingView):
 
         return index
 
-    def search(self, searchterm="", ignorecase=True):
+    def search(self, searchterm="", ignorecase=True, b_start=0, b_size=None):
         """Search the catalog tool
 
+        N.B. The number of all matching brains is set to `self.total`
+
         :param searchterm: The searchterm for the regular expression
         :param ignorecase: Flag to compile with re.IGNORECASE
+        :param b_start: Index of the first brain to return
+        :param b_size: Number of brains to return or None to return all
         :returns: List of catalog brains
         """
 
-        # TODO Append start and pagesize to return just that slice of results
-
         # start the timer for performance checks
         start = time.time()
 
@@ -820,35 +1186,143 @@ class ListingView(AjaxListingView):
         # get the searchable text index for this type
         search_index = self.get_search_index(catalog)
 
-        # return the unfiltered catalog results if no searchterm
-        if not searchterm:
-            brains = catalog(query)
-
-        # check if there is a searchable text index in the catalog
-        elif search_index:
-            # Always expand all categories if we have a searchterm
-            self.expand_all_categories = True
-            brains = self.text_index_search(
-                catalog, search_index, query, searchterm)
-
+        # let the catalog return only the requested batch
+        batch = b_size is not None and self.can_batch_search(
+            searchterm=searchterm, search_index=search_index)
+        if batch:
+            query["b_start"] = b_start
+            query["b_size"] = b_size
+
+        with self.timings.span("query"):
+            # return the unfiltered catalog results if no searchterm
+            if not searchterm:
+                brains = self.query_catalog(catalog, query)
+
+            # check if there is a searchable text index in the catalog
+            elif search_index:
+                # Always expand all categories if we have a searchterm
+                self.expand_all_categories = True
+                brains = self.text_index_search(
+                    catalog, search_index, query, searchterm)
+
+            else:
+                self.expand_all_categories = True
+                brains = self.metadata_search(
+                    catalog, query, searchterm, ignorecase)
+
+        self.total_is_estimate = False
+
+        # number of leading brains needed to return the requested batch
+        limit = None
+        if b_size is not None:
+            limit = b_start + b_size
+
+        # filter the brains only until the requested batch is filled
+        lazy_filter = limit is not None and not self.manual_sort_on
+
+        if batch:
+            self.total = self.get_result_count(brains)
+            # N.B. Catalogs that do not support batching return all brains
+            if len(brains) < self.total:
+                b_start = 0
+        elif lazy_filter and self.is_item_allowed_overridden():
+            with self.timings.span("filter"):
+                brains = self.get_allowed_items(brains, limit=limit)
+            self.total = len(brains)
+            # more allowed brains might follow
+            self.total_is_estimate = self.total >= limit
         else:
-            self.expand_all_categories = True
-            brains = self.metadata_search(
-                catalog, query, searchterm, ignorecase)
+            # Filter manually?
+            with self.timings.span("filter"):
+                brains = self.get_allowed_items(brains)
+            self.total = len(brains)
 
-        # Filter manually?
-        brains = filter(lambda brain: self.isItemAllowed(brain), brains)
+            # Sort manually?
+            if self.manual_sort_on:
+                with self.timings.span("sort"):
+                    brains = self.sort_brains(
+                        brains, sort_on=self.manual_sort_on, limit=limit)
 
-        # Sort manually?
-        if self.manual_sort_on:
-            brains = self.sort_brains(brains, sort_on=self.manual_sort_on)
+        # Return only the requested batch
+        if b_size is not None:
+            brains = brains[b_start:b_start + b_size]
 
         end = time.time()
         logger.info(u"ListingView::search: Search for '{}' executed in "
                     u"{:.2f}s ({} matches)"
-                    .format(searchterm, end - start, len(brains)))
+                    .format(searchterm, end - start, self.total))
         return brains
 
+    def can_batch_search(self, searchterm="", search_index=None):
+        """Checks if the catalog query can be limited to the requested batch
+
+        N.B. This method must be called after `get_catalog_query`, because the
+             `manual_sort_on` flag is set there.
+
+        :param searchterm: The searchterm of the current search
+        :param search_index: The searchable text index of the catalog
+        :returns: True if `b_start` and `b_size` can be set to the query
+        """
+        if not self.batch_search:
+            return False
+        # the brains are filtered by their metadata values
+        if searchterm and not search_index:
+            return False
+        # the brains are sorted manually
+        if self.manual_sort_on:
+            return False
+        # the brains are filtered by `isItemAllowed`
+        if self.is_item_allowed_overridden():
+            return False
+        return True
+
+    def get_allowed_items(self, brains, limit=None):
+        """Filter the brains by `isItemAllowed`
+
+        The brains are consumed lazily, so that no further brains are checked
+        (and probably woken up) once the limit of allowed brains is reached.
+
+        :param brains: Catalog brains
+        :param limit: Maximum number of allowed brains to return
+        :returns: List of allowed brains
+        """
+        if not self.is_item_allowed_overridden():
+            if limit is None:
+                return brains
+            return brains[:limit]
+        allowed = (brain for brain in brains if self.isItemAllowed(brain))
+        return list(itertools.islice(allowed, limit))
+
+    def is_item_allowed_overridden(self):
+        """Checks if the `isItemAllowed` method is overridden by a subclass
+
+        :returns: True if the brains need to be filtered manually
+        """
+        return self.is_overridden("isItemAllowed")
+
+    def is_overridden(self, name):
+        """Checks if the method of this class is overridden by a subclass
+
+        :param name: The name of the method
+        :returns: True if the method is overridden
+        """
+        func = getattr(getattr(self, name), "__func__", None)
+        return func is not getattr(ListingView, name).__func__
+
+    def get_result_count(self, brains):
+        """Returns the number of all brains matching the catalog query
+
+        Batched catalog results contain only the brains of the requested
+        batch, but provide the total count in `actual_result_count`.
+
+        :param brains: Catalog results
+        :returns: Number of all matching brains
+        """
+        count = getattr(brains, "actual_result_count", None)
+        if count is None:
+            return len(brains)
+        return count
+
     def isItemAllowed(self, obj):
         """ return if the item can be added to the items list.
         """
@@ -894,40 +1368,48 @@ class ListingView(AjaxListingView):
         value = self.resolve_value_for_column(column_id, item) or value
         return get_link(url, value=value)
 
+    def get_column_resolvers(self):
+        """Compile the column definitions to resolvers
+
+        Overridden `resolve_value_for_column` and
+        `resolve_replace_url_for_column` methods take precedence.
+
+        :returns: List of column resolvers in the order of the columns
+        """
+        value_overridden = self.is_overridden("resolve_value_for_column")
+        replace_overridden = self.is_overridden(
+            "resolve_replace_url_for_column")
+
+        resolvers = []
+        for key, column in self.columns.items():
+            resolver = ColumnResolver(self, key, column)
+            if value_overridden:
+                resolver.get_value = functools.partial(
+                    self.resolve_value_for_column, key)
+            if replace_overridden:
+                resolver.get_replace = functools.partial(
+                    self.resolve_replace_url_for_column, key)
+            resolvers.append(resolver)
+        return resolvers
+
     def make_empty_folderitem(self, **kw):
         """Create a new empty folderitem
+
+        N.B. The sub-mappings, e.g. `replace` or `allow_edit`, are created on
+        first access, see `senaite.app.listing.folderitem.FolderItem`
         """
-        item = {
-            "obj": None,
-            "id": "",
-            "uid": "",
-            "url": "",
-            "title": "",
-            "disabled": False,
-            "state_title": "",
-            "state_class": "",
-            "review_state": "",
-            "portal_type": "",
-            # a list of names of fields that may be edited on this item
-            "allow_edit": [],
-            # a dict where the column name works as a key and the value is
-            # the name of the field related with the column. It is used
-            # when the name given to the column and the content field it
-            # represents diverges. bika_listing_table_items.pt defines an
-            # attribute for each item, this attribute is named 'field' and
-            # the system fills it taking advantage of this dictionary or
-            # the name of the column if it isn't defined in the dict.
-            "field": {},
-            "before": {},
-            "after": {},
-            "replace": {},
-            "choices": {},
-            "class": {},
-            "tabindex": {},
-            # allows to set a per column help text, e.g.
-            # item["help"]["result"] = _("Some help text for the result")
-            "help": {},
-        }
+        item = FolderItem(
+            obj=None,
+            id="",
+            uid="",
+            url="",
+            title="",
+            disabled=False,
+            state_title="",
+            state_class="",
+            review_state="",
+            portal_type="",
+        )
         item.update(**kw)
         return item
 
@@ -949,13 +1431,59 @@ class ListingView(AjaxListingView):
                   function is mainly used to maintain the integrity with the
                   old version.
         """
+        return list(self.iter_folderitems())
+
+    def iter_folderitems(self):
+        """Generates the folderitems of the current page one by one
+
+        N.B. The `show_more` flag is set when the generator is exhausted
+
+        :returns: Generator of folderitems
+        """
         # idx increases one unit each time an object is added to the 'items'
         # dictionary to be returned. Note that if the item is not rendered,
         # the idx will not increase.
         idx = 0
-        results = []
         self.show_more = False
-        for obj in self._fetch_brains(self.limit_from):
+        timings = self.timings
+
+        with timings.span("search"):
+            brains = self._fetch_brains(self.limit_from)
+
+        # Collect the referenced UIDs to resolve their titles at once
+        self.title_resolver.collect(brains, self.uid_reference_columns)
+
+        # Columns which are filled in by a second request
+        deferred = filter(self.is_column_deferred, self.columns.keys())
+
+        # Compile the column definitions only once for all items and skip
+        # the columns which are hidden in the listing or deferred
+        resolvers = []
+        skipped = []
+        for resolver in self.get_column_resolvers():
+            key = resolver.key
+            if self.is_column_visible(key) and key not in deferred:
+                resolvers.append(resolver)
+            else:
+                skipped.append(key)
+
+        # Subscriber adapters that fill any of the visible columns
+        adapters = self.get_folder_item_adapters()
+
+        # The methods to call for each item
+        columns = map(lambda resolver: (
+            resolver.key, resolver.get_value, resolver.get_replace),
+            resolvers)
+        folderitem = self.folderitem
+        folder_item_funcs = map(lambda adapter: adapter.folder_item, adapters)
+
+        # Measure the columns, `folderitem` and adapters one by one
+        self.profiler = self.get_profiler()
+        if self.profiler:
+            columns, folderitem, folder_item_funcs = self.profile_folderitems(
+                columns, folderitem, adapters)
+
+        for obj in brains:
             # avoid creating unnecessary info for items outside the current
             # batch;  only the path is needed for the "select all" case...
             # we only take allowed items into account
@@ -965,49 +1493,112 @@ class ListingView(AjaxListingView):
                 break
 
             # create a new folderitem
-            item = self.make_empty_folderitem(**self.get_item_info(obj))
+            with timings.span("item_info"):
+                item = self.make_empty_folderitem(**self.get_item_info(obj))
+                item["deferred"] = deferred
+                # N.B. `folderitem` hooks might access the skipped columns
+                for key in skipped:
+                    item.setdefault(key, "")
 
             # Search for values for all columns in obj
-            for key in self.columns.keys():
-
-                # Resolve the value of this item for the given column
-                item[key] = self.resolve_value_for_column(key, item)
+            with timings.span("columns"):
+                for key, get_value, get_replace in columns:
+                    # Resolve the value of this item for the given column
+                    item[key] = get_value(item)
 
-                # Resolve the "replace_url" attr
-                replace = self.resolve_replace_url_for_column(key, item)
-                if replace:
-                    item["replace"][key] = replace
+                    # Resolve the "replace_url" attr
+                    replace = get_replace(item)
+                    if replace:
+                        item["replace"][key] = replace
 
             # Fill additional (folderitem func implemented by child classes)
-            item = self.folderitem(obj, item, idx)
+            with timings.span("folderitem"):
+                item = folderitem(obj, item, idx)
             if not item:
                 continue
 
             # Call folder_item from subscriber adapters
-            for subscriber in self.get_listing_view_adapters():
-                subscriber.folder_item(obj, item, idx)
+            with timings.span("adapters"):
+                for folder_item in folder_item_funcs:
+                    folder_item(obj, item, idx)
 
             # Dismiss item if cleared by subscribers
             if not item:
                 continue
 
-            results.append(item)
+            yield item
             idx += 1
 
-        return results
+    def get_profiler(self):
+        """Returns a profiler if profiling is enabled for this request
+
+        N.B. Managers can enable profiling with the `X-Listing-Profile` header
+
+        :returns: Profiler or None
+        """
+        enabled = get_registry_record("listing_enable_profiler", False)
+        if not enabled and self.request.getHeader("X-Listing-Profile"):
+            enabled = self.is_profile_visible()
+        if not enabled:
+            return None
+        return Profiler()
+
+    def is_profile_visible(self):
+        """Checks if the profile is returned to the current user
+
+        N.B. The profile contains the module paths of the adapters, therefore
+             it is only logged for other users than Managers
+
+        :returns: True if the current user is a Manager
+        """
+        user = getSecurityManager().getUser()
+        return user.has_role("Manager", self.context)
+
+    def profile_folderitems(self, columns, folderitem, adapters):
+        """Wrap the column functions, `folderitem` and adapters to profile
+
+        N.B. The resolvers are not modified, so that the replace URL function
+             calls the unwrapped value function of its column
+
+        :param columns: List of column key, value and replace URL functions
+        :param folderitem: The `folderitem` method of the view
+        :param adapters: Listing view adapters
+        :returns: Tuple of wrapped column functions, `folderitem` and
+                  `folder_item` functions
+        """
+        profiler = self.profiler
+        columns = [(key,
+                    profiler.wrap("column", key, get_value),
+                    profiler.wrap("replace_url", key, get_replace))
+                   for key, get_value, get_replace in columns]
+        folderitem = profiler.wrap(
+            "folderitem", self.__class__.__name__, folderitem)
+        folder_item_funcs = map(lambda adapter: profiler.wrap(
+            "adapter", "{}.{}".format(adapter.__class__.__module__,
+                                      adapter.__class__.__name__),
+            adapter.folder_item), adapters)
+        return columns, folderitem, folder_item_funcs
 
     @view.memoize
-    def url_or_path_to_url(self, url_or_path):
-        """Convert a given URL or path to an absolute URL
+    def get_portal_url(self):
+        """Returns the URL of the portal
+        """
+        return api.get_url(self.portal)
 
-        N.B. This method might receive paths from brain metadata.
-        These paths might or might not be rooted at the portal path.
+    @view.memoize
+    def get_portal_path(self):
+        """Returns the physical path of the portal
+        """
+        return api.get_path(self.portal)
+
+    def to_portal_relative_path(self, url_or_path):
+        """Convert a given URL or path to a path relative to the portal
 
         :param url_or_path: Absolute URL, physical path or relative path
-        :returns: Absolute URL
+        :returns: Path relative to the portal without leading slash
         """
-        portal_path = "{}/".format(api.get_path(self.portal))
-        portal_url = api.get_url(self.portal)
+        portal_path = "{}/".format(self.get_portal_path())
+        portal_url = self.get_portal_url()
 
         # remove the portal_url from the url_or_path
         if url_or_path.startswith(portal_url):
@@ -1019,5 +1610,26 @@ class ListingView(AjaxListingView):
         if url_or_path.startswith("/"):
             url_or_path = url_or_path.replace("/", "", 1)
 
-        url = "/".join([portal_url, url_or_path])
+        return url_or_path
+
+    def path_to_url(self, url_or_path):
+        """Convert a given URL or path to an URL without waking up the object
+
+        :param url_or_path: Absolute URL, physical path or relative path
+        :returns: Absolute URL
+        """
+        path = self.to_portal_relative_path(url_or_path)
+        return "/".join([self.get_portal_url(), path])
+
+    @view.memoize
+    def url_or_path_to_url(self, url_or_path):
+        """Convert a given URL or path to an absolute URL
+
+        N.B. This method might receive paths from brain metadata.
+        These paths might or might not be rooted at the portal path.
+
+        :param url_or_path: Absolute URL, physical path or relative path
+        :returns: Absolute URL
+        """
+        url = self.path_to_url(url_or_path)
         return addTokenToUrl(url)